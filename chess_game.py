@@ -1,11 +1,12 @@
-from chess_game_modules.ui import settings_screen
-from chess_game_modules.game import Game
-
 def main():
+    # Imported here so processes that re-import this module (spawned pool
+    # workers) don't load pygame.
+    from chess_game_modules.ui import settings_screen
+    from chess_game_modules.game import Game
     while True:
         board_pixel, difficulty, player_color = settings_screen()
         game = Game(board_pixel, difficulty, player_color)
         game.run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -4,3 +4,28 @@
 # - game.py: Game class
 # - utils.py: helpers (lerp, ease_in_out_cubic, load_piece_images)
 # - __init__.py: for package
+#
+# Names below are imported on first use, so `import chess_game_modules` and
+# the headless modules (ai, engine, selfplay, ...) never load pygame.
+import importlib
+
+_LAZY = {
+    "AI": ".ai",
+    "UCIEngine": ".engine",
+    "AIWorker": ".worker",
+    "Game": ".game",
+    "Button": ".ui",
+    "settings_screen": ".ui",
+}
+
+__all__ = list(_LAZY)
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
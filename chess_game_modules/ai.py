@@ -1,6 +1,17 @@
 import chess
+import multiprocessing
 import random
 import time
+from concurrent.futures import ProcessPoolExecutor
+from .transposition import TranspositionTable, PIECE_ZOBRIST, position_key, piece_key, state_key, EXACT, LOWER, UPPER
+from .pawns import PawnHashTable, pawn_key, pawn_structure
+from .evalcache import EvalCache
+from .ordering import MoveOrderer, mvv_lva, native_mvv_lva
+from .position import Position, encode_move, decode_move
+from .book import OpeningBook, BOOK_PATH
+from .bitbases import Bitbases, BITBASE_DIR
+
+MATE_SCORE = 999999
 
 PIECE_VALUES = {
     chess.PAWN: 100,
@@ -78,38 +89,113 @@ KING_MG_TABLE = [  # Middle game
      20, 30, 10,  0,  0, 10, 30, 20
 ]
 
+PIECE_SQUARE_TABLES = {
+    chess.PAWN: PAWN_TABLE,
+    chess.KNIGHT: KNIGHT_TABLE,
+    chess.BISHOP: BISHOP_TABLE,
+    chess.ROOK: ROOK_TABLE,
+    chess.QUEEN: QUEEN_TABLE,
+    chess.KING: KING_MG_TABLE
+}
+
 def get_piece_position_value(piece_type, square, is_white):
-    tables = {
-        chess.PAWN: PAWN_TABLE,
-        chess.KNIGHT: KNIGHT_TABLE,
-        chess.BISHOP: BISHOP_TABLE,
-        chess.ROOK: ROOK_TABLE,
-        chess.QUEEN: QUEEN_TABLE,
-        chess.KING: KING_MG_TABLE
-    }
-    table = tables.get(piece_type, [0] * 64)
+    table = PIECE_SQUARE_TABLES.get(piece_type, [0] * 64)
     if not is_white:
         index = 63 - square
     else:
         index = square
     return table[index]
 
-def evaluate(board):
+# Signed material + position value of a piece on each square, from White's point of view.
+PST_SCORES = {
+    color: {
+        piece_type: [
+            (1 if color == chess.WHITE else -1) * (PIECE_VALUES[piece_type] + get_piece_position_value(piece_type, sq, color == chess.WHITE))
+            for sq in chess.SQUARES
+        ]
+        for piece_type in chess.PIECE_TYPES
+    }
+    for color in chess.COLORS
+}
+
+def material_score(board):
+    score = 0
+    for color in chess.COLORS:
+        tables = PST_SCORES[color]
+        for piece_type in chess.PIECE_TYPES:
+            table = tables[piece_type]
+            for sq in chess.scan_forward(board.pieces_mask(piece_type, color)):
+                score += table[sq]
+    return score
+
+class IncrementalEvaluator:
+    def __init__(self, board):
+        self.score = material_score(board)
+        self.pawn_key = pawn_key(board)
+        self.board_key = piece_key(board)
+        self.stack = []
+    def key(self, board):
+        return self.board_key ^ state_key(board)
+    def push(self, board, move):
+        self.stack.append((self.score, self.pawn_key, self.board_key))
+        if move:
+            self.apply(board, move)
+        board.push(move)
+    def pop(self, board):
+        board.pop()
+        self.score, self.pawn_key, self.board_key = self.stack.pop()
+    def add_piece(self, color, piece_type, square):
+        self.score += PST_SCORES[color][piece_type][square]
+        key = PIECE_ZOBRIST[color][piece_type][square]
+        self.board_key ^= key
+        if piece_type == chess.PAWN:
+            self.pawn_key ^= key
+    def remove_piece(self, color, piece_type, square):
+        self.score -= PST_SCORES[color][piece_type][square]
+        key = PIECE_ZOBRIST[color][piece_type][square]
+        self.board_key ^= key
+        if piece_type == chess.PAWN:
+            self.pawn_key ^= key
+    def apply(self, board, move):
+        color = board.turn
+        piece_type = board.piece_type_at(move.from_square)
+        if board.is_castling(move):
+            rank = chess.square_rank(move.from_square)
+            if board.is_kingside_castling(move):
+                king_to, rook_from, rook_to = chess.square(6, rank), chess.square(7, rank), chess.square(5, rank)
+            else:
+                king_to, rook_from, rook_to = chess.square(2, rank), chess.square(0, rank), chess.square(3, rank)
+            self.remove_piece(color, chess.KING, move.from_square)
+            self.add_piece(color, chess.KING, king_to)
+            self.remove_piece(color, chess.ROOK, rook_from)
+            self.add_piece(color, chess.ROOK, rook_to)
+            return
+        if board.is_en_passant(move):
+            self.remove_piece(not color, chess.PAWN, move.to_square - 8 if color == chess.WHITE else move.to_square + 8)
+        else:
+            captured = board.piece_type_at(move.to_square)
+            if captured:
+                self.remove_piece(not color, captured, move.to_square)
+        self.remove_piece(color, piece_type, move.from_square)
+        self.add_piece(color, move.promotion or piece_type, move.to_square)
+
+CENTER_SQUARES = [chess.D4, chess.D5, chess.E4, chess.E5]
+CENTER_CONTROL_BONUS = 10
+
+def center_control(board):
+    score = 0
+    for sq in CENTER_SQUARES:
+        white_attackers = len(board.attackers(chess.WHITE, sq))
+        black_attackers = len(board.attackers(chess.BLACK, sq))
+        score += (white_attackers - black_attackers) * CENTER_CONTROL_BONUS
+    return score
+
+def evaluate(board, material=None, pawns=None):
     if board.is_checkmate():
-        return -999999 if board.turn else 999999
+        return -MATE_SCORE if board.turn else MATE_SCORE
     if board.is_stalemate() or board.is_insufficient_material():
         return 0
-    score = 0
-    for sq in chess.SQUARES:
-        piece = board.piece_at(sq)
-        if piece:
-            piece_value = PIECE_VALUES[piece.piece_type]
-            position_value = get_piece_position_value(piece.piece_type, sq, piece.color == chess.WHITE)
-            total_value = piece_value + position_value
-            if piece.color == chess.WHITE:
-                score += total_value
-            else:
-                score -= total_value
+    score = material_score(board) if material is None else material
     white_king_square = board.king(chess.WHITE)
     black_king_square = board.king(chess.BLACK)
     if white_king_square:
@@ -118,109 +204,678 @@ def evaluate(board):
     if black_king_square:
         black_king_attacks = len(board.attackers(chess.WHITE, black_king_square))
         score += black_king_attacks * 20
-    center_squares = [chess.D4, chess.D5, chess.E4, chess.E5]
-    for sq in center_squares:
-        white_attackers = len(board.attackers(chess.WHITE, sq))
-        black_attackers = len(board.attackers(chess.BLACK, sq))
-        score += (white_attackers - black_attackers) * 10
+    score += center_control(board)
     mobility_bonus = len(list(board.legal_moves)) * 2
     if board.turn == chess.WHITE:
         score += mobility_bonus
     else:
         score -= mobility_bonus
-    white_pawns = board.pieces(chess.PAWN, chess.WHITE)
-    black_pawns = board.pieces(chess.PAWN, chess.BLACK)
-    for file in range(8):
-        white_file_pawns = sum(1 for sq in white_pawns if chess.square_file(sq) == file)
-        black_file_pawns = sum(1 for sq in black_pawns if chess.square_file(sq) == file)
-        if white_file_pawns > 1:
-            score -= (white_file_pawns - 1) * 15
-        if black_file_pawns > 1:
-            score += (black_file_pawns - 1) * 15
-    for file in range(8):
-        white_has_pawn = any(chess.square_file(sq) == file for sq in white_pawns)
-        black_has_pawn = any(chess.square_file(sq) == file for sq in black_pawns)
-        if white_has_pawn:
-            adjacent_files = [f for f in [file-1, file+1] if 0 <= f <= 7]
-            if not any(any(chess.square_file(sq) == adj_file for sq in white_pawns) for adj_file in adjacent_files):
-                score -= 20
-        if black_has_pawn:
-            adjacent_files = [f for f in [file-1, file+1] if 0 <= f <= 7]
-            if not any(any(chess.square_file(sq) == adj_file for sq in black_pawns) for adj_file in adjacent_files):
-                score += 20
+    score += pawn_structure(board) if pawns is None else pawns
     return score
 
-def minimax(board, depth, alpha, beta, maximizing):
-    if depth == 0 or board.is_game_over():
-        return evaluate(board), None
-    best_move = None
-    moves = list(board.legal_moves)
-    def move_priority(move):
-        priority = 0
-        if board.is_capture(move):
-            captured_piece = board.piece_at(move.to_square)
-            if captured_piece:
-                priority += PIECE_VALUES[captured_piece.piece_type]
-        if move.promotion:
-            priority += 800
-        if move.to_square in [chess.D4, chess.D5, chess.E4, chess.E5]:
-            priority += 10
+def native_evaluate(position, pawns):
+    # evaluate() for a position.Position, term for term.
+    moves = position.legal_moves()
+    if not moves:
+        if position.is_check():
+            return -MATE_SCORE if position.turn else MATE_SCORE
+        return 0
+    if position.is_insufficient_material():
+        return 0
+    score = position.score
+    white_king_square = position.king(chess.WHITE)
+    black_king_square = position.king(chess.BLACK)
+    if white_king_square:
+        score -= chess.popcount(position.attackers_mask(chess.BLACK, white_king_square)) * 20
+    if black_king_square:
+        score += chess.popcount(position.attackers_mask(chess.WHITE, black_king_square)) * 20
+    for sq in CENTER_SQUARES:
+        score += (chess.popcount(position.attackers_mask(chess.WHITE, sq)) - chess.popcount(position.attackers_mask(chess.BLACK, sq))) * CENTER_CONTROL_BONUS
+    mobility_bonus = len(moves) * 2
+    if position.turn == chess.WHITE:
+        score += mobility_bonus
+    else:
+        score -= mobility_bonus
+    return score + pawns
+
+MAX_DEPTH = 32
+TIME_CHECK_INTERVAL = 32
+QS_MAX_DEPTH = 8
+# Quiescence nodes one horizon node may spend; the bench never needs more than a few hundred.
+QS_NODE_LIMIT = 2_000
+DELTA_MARGIN = 200
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_MIN_DEPTH = 3
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVES = 3
+LMR_REDUCTION = 1
+INFINITY = 1_000_000
+ASPIRATION_WINDOW = 100
+ASPIRATION_MIN_DEPTH = 4
+
+class SearchTimeout(Exception):
+    pass
+
+class SearchStats:
+    # Counters for one search. Table hits and probes are this search's share
+    # of the AI's long-lived tables; depths holds (depth, nodes, seconds) per
+    # completed iteration.
+    TABLES = ("tt", "eval_cache", "pawn_table")
+    def __init__(self):
+        self.nodes = 0
+        self.qnodes = 0
+        self.qnode_limit_hits = 0
+        self.evals = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.null_move_cutoffs = 0
+        self.pvs_researches = 0
+        self.aspiration_researches = 0
+        self.lmr_reductions = 0
+        self.lmr_researches = 0
+        for table in self.TABLES:
+            setattr(self, table + "_hits", 0)
+            setattr(self, table + "_probes", 0)
+        self.depths = []
+    def total_nodes(self):
+        return self.nodes + self.qnodes
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+    def branching_factor(self):
+        # Effective branching factor: growth in nodes from one iteration to the next.
+        if len(self.depths) < 2 or not self.depths[-2][1]:
+            return 0.0
+        return self.depths[-1][1] / self.depths[-2][1]
+    def hit_rate(self, table):
+        probes = getattr(self, table + "_probes")
+        return getattr(self, table + "_hits") / probes if probes else 0.0
+    def record_cutoff(self, index):
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+    def record_depth(self, depth, seconds):
+        done = sum(d[1] for d in self.depths)
+        spent = sum(d[2] for d in self.depths)
+        self.depths.append((depth, self.total_nodes() - done, seconds - spent))
+    def record_tables(self, before, after):
+        for table in self.TABLES:
+            setattr(self, table + "_hits", after[table][0] - before[table][0])
+            setattr(self, table + "_probes", after[table][1] - before[table][1])
+    def merge(self, other):
+        for name, value in vars(other).items():
+            if name != "depths":
+                setattr(self, name, getattr(self, name, 0) + value)
+        # Workers search side by side: nodes add up, wall time is the slowest worker's.
+        merged = {depth: (nodes, seconds) for depth, nodes, seconds in self.depths}
+        for depth, nodes, seconds in other.depths:
+            old_nodes, old_seconds = merged.get(depth, (0, 0.0))
+            merged[depth] = (old_nodes + nodes, max(old_seconds, seconds))
+        self.depths = [(depth, nodes, seconds) for depth, (nodes, seconds) in sorted(merged.items())]
+    def as_dict(self):
+        stats = {name: value for name, value in vars(self).items() if name != "depths"}
+        stats["depths"] = [{"depth": depth, "nodes": nodes, "seconds": seconds} for depth, nodes, seconds in self.depths]
+        stats["first_move_cutoff_rate"] = self.first_move_cutoff_rate()
+        stats["branching_factor"] = self.branching_factor()
+        for table in self.TABLES:
+            stats[table + "_hit_rate"] = self.hit_rate(table)
+        return stats
+
+class SearchContext:
+    def __init__(self, tt=None, deadline=None, pv=None, pawn_table=None, qnode_limit=QS_NODE_LIMIT, orderer=None, root_moves=None, bitbases=None, eval_cache=None, stop_event=None, null_move=False, lmr=False):
+        self.tt = tt if tt is not None else TranspositionTable()
+        self.null_move = null_move
+        self.lmr = lmr
+        self.root_moves = root_moves
+        self.stop_event = stop_event
+        self.interruptible = True
+        self.bitbases = bitbases
+        self.eval_cache = eval_cache if eval_cache is not None else EvalCache()
+        self.orderer = orderer if orderer is not None else MoveOrderer()
+        self.deadline = deadline
+        self.pv = pv or []
+        self.stats = SearchStats()
+        self.qnode_limit = qnode_limit
+        self.qnode_budget = 0
+        self.evaluator = None
+        self.pawn_table = pawn_table if pawn_table is not None else PawnHashTable()
+    def table_counters(self):
+        return {
+            "tt": (self.tt.hits, self.tt.probes),
+            "eval_cache": (self.eval_cache.hits, self.eval_cache.hits + self.eval_cache.misses),
+            "pawn_table": (self.pawn_table.hits, self.pawn_table.probes),
+        }
+    def evaluate(self, board):
+        self.stats.evals += 1
+        if self.bitbases is not None and chess.popcount(board.occupied) == 3:
+            score = self.bitbases.evaluate(board)
+            if score is not None:
+                return score
+        evaluator = self.evaluator
+        key = evaluator.key(board)
+        score = self.eval_cache.get(key)
+        if score is None:
+            score = evaluate(board, evaluator.score, self.pawn_table.score(board, evaluator.pawn_key))
+            self.eval_cache.put(key, score)
+        return score
+    def evaluate_relative(self, board):
+        # Negamax wants the score from the side to move's point of view.
+        score = self.evaluate(board)
+        return score if board.turn == chess.WHITE else -score
+    def native_evaluate(self, position):
+        self.stats.evals += 1
+        if self.bitbases is not None and chess.popcount(position.occupied) == 3:
+            score = self.bitbases.evaluate(position)
+            if score is not None:
+                return score
+        key = position.key
+        score = self.eval_cache.get(key)
+        if score is None:
+            score = native_evaluate(position, self.pawn_table.score(position, position.pawn_key))
+            self.eval_cache.put(key, score)
+        return score
+    def native_evaluate_relative(self, position):
+        score = self.native_evaluate(position)
+        return score if position.turn == chess.WHITE else -score
+    def check_time(self):
+        if not self.interruptible or self.stats.total_nodes() % TIME_CHECK_INTERVAL:
+            return
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchTimeout()
+        if self.deadline is not None and time.time() >= self.deadline:
+            raise SearchTimeout()
+    def pv_move(self, board, ply):
+        # Only suggest the previous iteration's move while we are still on its line.
+        if ply >= len(self.pv):
+            return None
+        if ply and board.move_stack[-ply:] != self.pv[:ply]:
+            return None
+        return self.pv[ply]
+
+def principal_variation(board, tt, max_length):
+    pv = []
+    seen = set()
+    for _ in range(max_length):
+        key = position_key(board)
+        move = tt.best_move(key)
+        if move is None or key in seen or not board.is_legal(move):
+            break
+        seen.add(key)
+        pv.append(move)
         board.push(move)
-        is_check = board.is_check()
+    for _ in pv:
         board.pop()
-        if is_check:
-            priority += 50
-        return priority
-    moves.sort(key=move_priority, reverse=True)
+    return pv
+
+def capture_gain(board, move):
+    gain = PIECE_VALUES[move.promotion] - PIECE_VALUES[chess.PAWN] if move.promotion else 0
+    if board.is_en_passant(move):
+        return gain + PIECE_VALUES[chess.PAWN]
+    captured = board.piece_type_at(move.to_square)
+    return gain + PIECE_VALUES[captured] if captured else gain
+
+def tactical_moves(board):
+    moves = list(board.generate_legal_captures())
+    pawns = board.pawns & board.occupied_co[board.turn]
+    for move in board.generate_legal_moves(pawns, chess.BB_BACKRANKS & ~board.occupied):
+        moves.append(move)
+    moves.sort(key=lambda m: mvv_lva(board, m), reverse=True)
+    return moves
+
+def quiescence(board, alpha, beta, ctx, qdepth=0):
+    if not qdepth:
+        # The budget starts afresh at every horizon node, so long searches keep quiescence.
+        ctx.qnode_budget = ctx.stats.qnodes + ctx.qnode_limit
+    ctx.stats.qnodes += 1
+    ctx.check_time()
+    stand_pat = ctx.evaluate_relative(board)
+    if qdepth >= QS_MAX_DEPTH or ctx.stats.qnodes > ctx.qnode_budget:
+        ctx.stats.qnode_limit_hits += 1
+        return stand_pat
+    if abs(stand_pat) >= MATE_SCORE:
+        return stand_pat
+    if stand_pat >= beta:
+        return stand_pat
+    alpha = max(alpha, stand_pat)
+    best_score = stand_pat
+    for move in tactical_moves(board):
+        # Delta pruning: even winning this material cleanly cannot reach the window.
+        if stand_pat + capture_gain(board, move) + DELTA_MARGIN <= alpha:
+            continue
+        ctx.evaluator.push(board, move)
+        score = -quiescence(board, -beta, -alpha, ctx, qdepth + 1)
+        ctx.evaluator.pop(board)
+        if score > best_score:
+            best_score = score
+        alpha = max(alpha, score)
+        if alpha >= beta:
+            break
+    return best_score
+
+def has_pieces(board, color):
+    # Anything besides king and pawns; without it a null move may hide zugzwang.
+    return bool(board.occupied_co[color] & ~(board.pawns | board.kings))
+
+def can_null_move(board, depth, ply, in_check, ctx):
+    if not ctx.null_move or not ply or depth < NULL_MOVE_MIN_DEPTH or in_check:
+        return False
+    # Never two null moves in a row.
+    return bool(board.move_stack[-1]) and has_pieces(board, board.turn)
+
+def can_reduce(board, move, index, depth, ply, in_check, ctx):
+    # Late quiet moves are searched shallower first; tactical ones never are.
+    if not ctx.lmr or not ply or depth < LMR_MIN_DEPTH or index < LMR_MIN_MOVES or in_check:
+        return False
+    return not move.promotion and not board.is_capture(move) and not board.gives_check(move)
+
+def negamax(board, depth, alpha, beta, ctx, ply=0):
+    # Principal variation search; scores are from the side to move's point of view.
+    if depth <= 0:
+        return quiescence(board, alpha, beta, ctx), None
+    ctx.stats.nodes += 1
+    ctx.check_time()
+    if ply and ctx.bitbases is not None and chess.popcount(board.occupied) == 3:
+        if ctx.bitbases.probe(board) is False:
+            return 0, None
+    # Any repetition after the root scores as a draw, so a winning side has to
+    # make progress instead of shuffling until the game is drawn by repetition.
+    if ply and board.is_repetition(2):
+        return 0, None
+    key = ctx.evaluator.key(board)
+    entry = ctx.tt.probe(key)
+    tt_move = None
+    # A root restricted to some moves must not take a stored result for the whole position.
+    restricted = ply == 0 and ctx.root_moves is not None
+    if entry:
+        tt_move = entry.move
+        if entry.depth >= depth and not restricted:
+            if entry.flag == EXACT:
+                return entry.score, entry.move
+            if entry.flag == LOWER and entry.score >= beta:
+                return entry.score, entry.move
+            if entry.flag == UPPER and entry.score <= alpha:
+                return entry.score, entry.move
+    if board.is_game_over():
+        return ctx.evaluate_relative(board), None
+    in_check = board.is_check()
+    if can_null_move(board, depth, ply, in_check, ctx):
+        # Null move: if passing still fails high, a real move would too.
+        ctx.evaluator.push(board, chess.Move.null())
+        score = -negamax(board, depth - 1 - NULL_MOVE_REDUCTION, -beta, -beta + 1, ctx, ply + 1)[0]
+        ctx.evaluator.pop(board)
+        if score >= beta:
+            ctx.stats.null_move_cutoffs += 1
+            return beta, None
+    alpha_orig = alpha
+    best_score, best_move = -INFINITY, None
+    pv_move = ctx.pv_move(board, ply)
+    moves = ctx.orderer.order(board, ctx.root_moves if restricted else board.legal_moves, ply, tt_move, pv_move)
+    for index, move in enumerate(moves):
+        reduction = LMR_REDUCTION if can_reduce(board, move, index, depth, ply, in_check, ctx) else 0
+        ctx.evaluator.push(board, move)
+        if index == 0:
+            score = -negamax(board, depth - 1, -beta, -alpha, ctx, ply + 1)[0]
+        else:
+            # Later moves only have to prove they are no better than alpha.
+            if reduction:
+                ctx.stats.lmr_reductions += 1
+            score = -negamax(board, depth - 1 - reduction, -alpha - 1, -alpha, ctx, ply + 1)[0]
+            if reduction and score > alpha:
+                ctx.stats.lmr_researches += 1
+                score = -negamax(board, depth - 1, -alpha - 1, -alpha, ctx, ply + 1)[0]
+            if alpha < score < beta:
+                ctx.stats.pvs_researches += 1
+                score = -negamax(board, depth - 1, -beta, -alpha, ctx, ply + 1)[0]
+        ctx.evaluator.pop(board)
+        if score > best_score:
+            best_score, best_move = score, move
+        alpha = max(alpha, score)
+        if alpha >= beta:
+            ctx.stats.record_cutoff(index)
+            ctx.orderer.record_cutoff(board, move, ply, depth)
+            break
+    if best_score <= alpha_orig:
+        flag = UPPER
+    elif best_score >= beta:
+        flag = LOWER
+    else:
+        flag = EXACT
+    ctx.tt.store(key, depth, best_score, flag, best_move)
+    return best_score, best_move
+
+def minimax(board, depth, alpha, beta, maximizing, ctx=None, ply=0):
+    # White-relative entry point: scores are positive for White and
+    # `maximizing` says whether White is to move.
+    if ctx is None:
+        ctx = SearchContext()
+    if ctx.evaluator is None:
+        ctx.evaluator = IncrementalEvaluator(board)
     if maximizing:
-        max_eval = -1_000_000
-        for move in moves:
-            board.push(move)
-            eval_score, _ = minimax(board, depth - 1, alpha, beta, False)
-            board.pop()
-            if eval_score > max_eval:
-                max_eval = eval_score
-                best_move = move
-            alpha = max(alpha, eval_score)
-            if beta <= alpha:
-                break
-        return max_eval, best_move
+        return negamax(board, depth, alpha, beta, ctx, ply)
+    score, move = negamax(board, depth, -beta, -alpha, ctx, ply)
+    return -score, move
+
+# The same search over a position.Position with int moves. Every function
+# mirrors its python-chess counterpart above, so both visit the same tree.
+
+def native_principal_variation(position, tt, max_length):
+    pv = []
+    seen = set()
+    for _ in range(max_length):
+        key = position.key
+        move = tt.best_move(key)
+        if move is None or key in seen or move not in position.legal_moves():
+            break
+        seen.add(key)
+        pv.append(move)
+        position.push(move)
+    for _ in pv:
+        position.pop()
+    return pv
+
+def native_capture_gain(position, move):
+    promotion = move >> 12
+    gain = PIECE_VALUES[promotion] - PIECE_VALUES[chess.PAWN] if promotion else 0
+    if position.is_en_passant(move):
+        return gain + PIECE_VALUES[chess.PAWN]
+    captured = position.piece_type_at(move >> 6 & 63)
+    return gain + PIECE_VALUES[captured] if captured else gain
+
+def native_tactical_moves(position):
+    moves = position.legal_captures()
+    pawns = position.pieces_mask(chess.PAWN, position.turn)
+    moves.extend(position.legal_moves(pawns, chess.BB_BACKRANKS & ~position.occupied))
+    return sorted(moves, key=lambda m: native_mvv_lva(position, m), reverse=True)
+
+def native_quiescence(position, alpha, beta, ctx, qdepth=0):
+    if not qdepth:
+        ctx.qnode_budget = ctx.stats.qnodes + ctx.qnode_limit
+    ctx.stats.qnodes += 1
+    ctx.check_time()
+    stand_pat = ctx.native_evaluate_relative(position)
+    if qdepth >= QS_MAX_DEPTH or ctx.stats.qnodes > ctx.qnode_budget:
+        ctx.stats.qnode_limit_hits += 1
+        return stand_pat
+    if abs(stand_pat) >= MATE_SCORE:
+        return stand_pat
+    if stand_pat >= beta:
+        return stand_pat
+    alpha = max(alpha, stand_pat)
+    best_score = stand_pat
+    for move in native_tactical_moves(position):
+        if stand_pat + native_capture_gain(position, move) + DELTA_MARGIN <= alpha:
+            continue
+        position.push(move)
+        score = -native_quiescence(position, -beta, -alpha, ctx, qdepth + 1)
+        position.pop()
+        if score > best_score:
+            best_score = score
+        alpha = max(alpha, score)
+        if alpha >= beta:
+            break
+    return best_score
+
+def native_can_reduce(position, move, index, depth, ply, in_check, ctx):
+    if not ctx.lmr or not ply or depth < LMR_MIN_DEPTH or index < LMR_MIN_MOVES or in_check:
+        return False
+    return not move >> 12 and not position.is_capture(move) and not position.gives_check(move)
+
+def native_negamax(position, depth, alpha, beta, ctx, ply=0):
+    if depth <= 0:
+        return native_quiescence(position, alpha, beta, ctx), None
+    ctx.stats.nodes += 1
+    ctx.check_time()
+    if ply and ctx.bitbases is not None and chess.popcount(position.occupied) == 3:
+        if ctx.bitbases.probe(position) is False:
+            return 0, None
+    if ply and position.is_repetition(2):
+        return 0, None
+    key = position.key
+    entry = ctx.tt.probe(key)
+    tt_move = None
+    restricted = ply == 0 and ctx.root_moves is not None
+    if entry:
+        tt_move = entry.move
+        if entry.depth >= depth and not restricted:
+            if entry.flag == EXACT:
+                return entry.score, entry.move
+            if entry.flag == LOWER and entry.score >= beta:
+                return entry.score, entry.move
+            if entry.flag == UPPER and entry.score <= alpha:
+                return entry.score, entry.move
+    # Game over as Board.is_game_over() sees it: no moves, dead position,
+    # seventy-five move rule or fivefold repetition.
+    moves = position.legal_moves()
+    if not moves or position.is_insufficient_material() or position.halfmove_clock >= 150 or position.is_repetition(5):
+        return ctx.native_evaluate_relative(position), None
+    in_check = position.is_check()
+    if can_null_move(position, depth, ply, in_check, ctx):
+        position.push_null()
+        score = -native_negamax(position, depth - 1 - NULL_MOVE_REDUCTION, -beta, -beta + 1, ctx, ply + 1)[0]
+        position.pop()
+        if score >= beta:
+            ctx.stats.null_move_cutoffs += 1
+            return beta, None
+    alpha_orig = alpha
+    best_score, best_move = -INFINITY, None
+    pv_move = ctx.pv_move(position, ply)
+    moves = ctx.orderer.native_order(position, ctx.root_moves if restricted else moves, ply, tt_move, pv_move)
+    for index, move in enumerate(moves):
+        reduction = LMR_REDUCTION if native_can_reduce(position, move, index, depth, ply, in_check, ctx) else 0
+        position.push(move)
+        if index == 0:
+            score = -native_negamax(position, depth - 1, -beta, -alpha, ctx, ply + 1)[0]
+        else:
+            if reduction:
+                ctx.stats.lmr_reductions += 1
+            score = -native_negamax(position, depth - 1 - reduction, -alpha - 1, -alpha, ctx, ply + 1)[0]
+            if reduction and score > alpha:
+                ctx.stats.lmr_researches += 1
+                score = -native_negamax(position, depth - 1, -alpha - 1, -alpha, ctx, ply + 1)[0]
+            if alpha < score < beta:
+                ctx.stats.pvs_researches += 1
+                score = -native_negamax(position, depth - 1, -beta, -alpha, ctx, ply + 1)[0]
+        position.pop()
+        if score > best_score:
+            best_score, best_move = score, move
+        alpha = max(alpha, score)
+        if alpha >= beta:
+            ctx.stats.record_cutoff(index)
+            ctx.orderer.native_record_cutoff(position, move, ply, depth)
+            break
+    if best_score <= alpha_orig:
+        flag = UPPER
+    elif best_score >= beta:
+        flag = LOWER
     else:
-        min_eval = 1_000_000
-        for move in moves:
-            board.push(move)
-            eval_score, _ = minimax(board, depth - 1, alpha, beta, True)
-            board.pop()
-            if eval_score < min_eval:
-                min_eval = eval_score
-                best_move = move
-            beta = min(beta, eval_score)
-            if beta <= alpha:
-                break
-        return min_eval, best_move
+        flag = EXACT
+    ctx.tt.store(key, depth, best_score, flag, best_move)
+    return best_score, best_move
+
+def aspiration_search(board, depth, previous, ctx, search=negamax):
+    # Root search in a narrow window around the last iteration's score,
+    # widened on the failing side until the score lands inside it.
+    # `search` is negamax, or native_negamax with a Position for `board`.
+    if depth < ASPIRATION_MIN_DEPTH or previous is None or abs(previous) >= MATE_SCORE:
+        return search(board, depth, -INFINITY, INFINITY, ctx)
+    low = high = ASPIRATION_WINDOW
+    while True:
+        alpha = max(-INFINITY, previous - low)
+        beta = min(INFINITY, previous + high)
+        score, move = search(board, depth, alpha, beta, ctx)
+        if score <= alpha and alpha > -INFINITY:
+            low *= 4
+        elif score >= beta and beta < INFINITY:
+            high *= 4
+        else:
+            return score, move
+        ctx.stats.aspiration_researches += 1
+
+_worker_ai = None
+
+def search_root_moves(board, root_moves, max_depth, think_time, null_move=True, lmr=True, native=True):
+    # Runs in a pool process; the module-level AI keeps its tables between calls.
+    global _worker_ai
+    if _worker_ai is None:
+        _worker_ai = AI(book_path=None)
+    _worker_ai.null_move = null_move
+    _worker_ai.lmr = lmr
+    _worker_ai.native = native
+    _worker_ai.search(board, max_depth, think_time, root_moves=root_moves)
+    return _worker_ai.iterations, _worker_ai.last_stats
 
 class AI:
-    def __init__(self, difficulty="Medium"):
-        self.set_difficulty(difficulty)
-    def set_difficulty(self, diff):
+    def __init__(self, difficulty="Medium", workers=1, book_path=BOOK_PATH, bitbase_dir=BITBASE_DIR, eval_cache_size=1 << 16, seed=None, on_stats=None, null_move=True, lmr=True, native=True):
+        # One table per AI, and Game keeps one AI, so work carries across moves.
+        self.rng = random.Random(seed)
+        self.tt = TranspositionTable()
+        self.pawn_table = PawnHashTable()
+        self.orderer = MoveOrderer()
+        self.eval_cache = EvalCache(eval_cache_size)
+        self.book = OpeningBook.open(book_path)
+        self.bitbases = Bitbases.open(bitbase_dir)
+        self.workers = 1
+        self.executor = None
+        self.last_depth = 0
+        self.last_stats = None
+        self.last_pv = []
+        # Called with the live SearchStats after every completed iteration.
+        self.on_stats = on_stats
+        # Selective search; each can be switched off to measure it on its own.
+        self.null_move = null_move
+        self.lmr = lmr
+        # Search a position.Position instead of the chess.Board; same tree, less overhead.
+        # The transposition table then holds int moves, so don't switch it between searches.
+        self.native = native
+        self.iterations = []
+        self.set_difficulty(difficulty, workers)
+    def set_difficulty(self, diff, workers=None):
+        # Difficulty is a time budget; depth is only a safety cap.
         self.difficulty = diff
+        self.max_depth = MAX_DEPTH
         if diff == "Easy":
-            self.depth = 2
             self.randomness = 0.25
             self.think_time = 0.5
         elif diff == "Medium":
-            self.depth = 3
             self.randomness = 0.10
             self.think_time = 1.0
         else:
-            self.depth = 4
             self.randomness = 0.00
             self.think_time = 2.0
-    def choose_move(self, board):
+        if workers is not None and workers != self.workers:
+            self.close_pool()
+            self.workers = max(1, workers)
+    def close_pool(self):
+        # The pool is sized by self.workers; the next parallel search starts a new one.
+        # parallel_search waits for all its futures, so nothing is left queued.
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+    def close(self):
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+        if self.bitbases is not None:
+            self.bitbases.close()
+            self.bitbases = None
+        self.close_pool()
+    def search(self, board, max_depth=None, think_time=None, root_moves=None, stop_event=None, on_iteration=None):
+        # The search (the native move generator in particular) assumes a reachable
+        # position: both kings on the board, the side not to move not in check.
+        if not board.is_valid():
+            raise ValueError(f"illegal position: {board.fen()}")
+        max_depth = max_depth or self.max_depth
+        # Pool workers can't see stop_event, so a stoppable search stays in-process.
+        if self.workers > 1 and root_moves is None and stop_event is None and board.legal_moves.count() > 1:
+            return self.parallel_search(board, max_depth, think_time)
+        start = time.time()
+        deadline = start + think_time if think_time else None
+        self.orderer.new_search()
+        ctx = SearchContext(self.tt, pawn_table=self.pawn_table, orderer=self.orderer, root_moves=root_moves, bitbases=self.bitbases, eval_cache=self.eval_cache, deadline=deadline, stop_event=stop_event, null_move=self.null_move, lmr=self.lmr)
+        color = 1 if board.turn == chess.WHITE else -1
+        stack_size = len(board.move_stack)
+        best_score, best_move = 0, None
+        previous = None
+        self.last_depth = 0
+        self.last_stats = ctx.stats
+        self.last_pv = []
+        self.iterations = []
+        counters = ctx.table_counters()
+        if self.native:
+            # Converted once here; only the chosen move and the PV go back to chess.Move.
+            root = Position(board, PST_SCORES)
+            if root_moves is not None:
+                ctx.root_moves = [encode_move(move) for move in root_moves]
+            kernel, variation = native_negamax, native_principal_variation
+        else:
+            root = board
+            ctx.evaluator = IncrementalEvaluator(board)
+            kernel, variation = negamax, principal_variation
+        for depth in range(1, max_depth + 1):
+            # Depth 1 always completes so there is a move to fall back on.
+            ctx.interruptible = depth > 1
+            try:
+                previous, move = aspiration_search(root, depth, previous, ctx, kernel)
+                score = previous * color
+            except SearchTimeout:
+                while len(board.move_stack) > stack_size:
+                    board.pop()
+                break
+            if self.native and move is not None:
+                move = decode_move(move)
+            if move is not None:
+                best_score, best_move = score, move
+            self.last_depth = depth
+            self.iterations.append((depth, score, move))
+            ctx.stats.record_depth(depth, time.time() - start)
+            ctx.stats.record_tables(counters, ctx.table_counters())
+            if self.on_stats is not None:
+                self.on_stats(ctx.stats)
+            ctx.pv = variation(root, self.tt, depth)
+            self.last_pv = [decode_move(move) for move in ctx.pv] if self.native else ctx.pv
+            if on_iteration is not None:
+                on_iteration(depth, score, self.last_pv, ctx.stats, time.time() - start)
+            if abs(score) >= MATE_SCORE or (stop_event is not None and stop_event.is_set()):
+                break
+            # The next iteration costs several times this one; don't start what can't finish.
+            if deadline is not None and time.time() + (time.time() - start) * 2 >= deadline:
+                break
+        ctx.stats.record_tables(counters, ctx.table_counters())
+        return best_score, best_move
+    def parallel_search(self, board, max_depth, think_time):
+        # Root splitting: each worker deepens its own share of the root moves,
+        # and the shares are compared at the deepest depth all of them finished.
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        tt_move = self.tt.best_move(position_key(board))
+        if self.native and tt_move is not None:
+            tt_move = decode_move(tt_move)
+        moves = self.orderer.order(board, board.legal_moves, 0, tt_move)
+        count = min(self.workers, len(moves))
+        futures = [self.executor.submit(search_root_moves, board, moves[i::count], max_depth, think_time, self.null_move, self.lmr, self.native) for i in range(count)]
+        results = [future.result() for future in futures]
+        depth = min(iterations[-1][0] for iterations, _ in results)
+        maximizing = board.turn == chess.WHITE
+        self.last_stats = SearchStats()
+        best_score, best_move = None, None
+        for iterations, stats in results:
+            self.last_stats.merge(stats)
+            _, score, move = next(item for item in iterations if item[0] == depth)
+            if best_move is None or (score > best_score if maximizing else score < best_score):
+                best_score, best_move = score, move
+        self.last_depth = depth
+        self.iterations = [(depth, best_score, best_move)]
+        self.tt.store(position_key(board), depth, best_score if maximizing else -best_score, EXACT, encode_move(best_move) if self.native else best_move)
+        if self.on_stats is not None:
+            self.on_stats(self.last_stats)
+        return best_score, best_move
+    def quick_move(self, board):
+        # A move picked without searching (book, randomness, only move), or None.
         moves = list(board.legal_moves)
-        if not moves:
-            return None
-        if random.random() < self.randomness:
+        if self.book is not None:
+            move = self.book.choose(board, self.rng)
+            if move is not None:
+                return move
+        if self.rng.random() < self.randomness:
             good_moves = []
             for move in moves:
                 if board.is_capture(move):
@@ -231,13 +886,36 @@ class AI:
                         good_moves.append(move)
                     board.pop()
             if good_moves:
-                return random.choice(good_moves)
+                return self.rng.choice(good_moves)
             else:
-                return random.choice(moves)
-        start = time.time()
-        _, move = minimax(board, self.depth, -1_000_000, 1_000_000, board.turn == chess.WHITE)
-        elapsed = time.time() - start
-        to_sleep = self.think_time - elapsed
-        if to_sleep > 0:
-            time.sleep(to_sleep)
-        return move if move else random.choice(moves)
+                return self.rng.choice(moves)
+        if len(moves) == 1:
+            return moves[0]
+        return None
+    def choose_move(self, board, stop_event=None):
+        if not any(board.legal_moves):
+            return None
+        self.last_depth = 0
+        self.last_stats = None
+        self.last_pv = []
+        move = self.quick_move(board)
+        if move is not None:
+            return move
+        _, move = self.search(board, think_time=self.think_time, stop_event=stop_event)
+        return move if move else self.rng.choice(list(board.legal_moves))
+    def expected_reply(self, board):
+        # The opponent's answer to our last move, as predicted by the last search.
+        pv = self.last_pv
+        if len(pv) < 2 or not board.move_stack or board.peek() != pv[0] or not board.is_legal(pv[1]):
+            return None
+        return pv[1]
+    def ponder(self, board, stop_event):
+        # Search on the opponent's time, capped at the move's own think_time so
+        # a ponder hit is answered sooner but never searched deeper than a normal
+        # move. The caller sets stop_event to end it early; the shared tables
+        # keep what it found.
+        self.last_depth = 0
+        self.last_stats = None
+        self.last_pv = []
+        _, move = self.search(board, think_time=self.think_time, stop_event=stop_event)
+        return move
@@ -0,0 +1,282 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import chess
+import chess.pgn
+from .ai import AI, evaluate
+
+CHECKPOINT_INTERVAL = 5.0
+
+def read_records(paths, skip=0):
+    # Games (.pgn) and positions (anything else, one FEN/EPD per line) in input
+    # order, parsed one at a time. The first `skip` records are only skipped over.
+    index = 0
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as handle:
+            if path.lower().endswith(".pgn"):
+                while True:
+                    if index < skip:
+                        if not chess.pgn.skip_game(handle):
+                            break
+                        index += 1
+                        continue
+                    game = chess.pgn.read_game(handle)
+                    if game is None:
+                        break
+                    yield {"index": index, "source": path, "game": game}
+                    index += 1
+            else:
+                for line in handle:
+                    line = line.strip()
+                    if not line or line.startswith("#"):
+                        continue
+                    if index >= skip:
+                        yield {"index": index, "source": path, "epd": line}
+                    index += 1
+
+def parse_position(line):
+    board = chess.Board()
+    fields = line.split()
+    if len(fields) >= 6 and fields[4].isdigit():
+        board.set_fen(" ".join(fields[:6]))
+        return board, {}
+    return board, board.set_epd(line)
+
+def record_jobs(record, depth, think_time):
+    # One job per position: the game's start FEN plus the moves leading to it,
+    # so the search sees the same history (and repetitions) as the game.
+    # A record that can't be analysed gets an "error" and no jobs instead of
+    # stopping the run (and every resume of it) there.
+    try:
+        board = record["game"].board() if "game" in record else parse_position(record["epd"])[0]
+        if not board.is_valid():
+            raise ValueError(f"illegal position: {board.fen()}")
+    except ValueError as error:
+        record["error"] = str(error)
+        return []
+    if "game" in record:
+        moves = [move.uci() for move in record["game"].mainline_moves()]
+        return [(board.fen(), moves[:ply], depth, think_time) for ply in range(len(moves) + 1)]
+    return [(board.fen(), [], depth, think_time)]
+
+def analyse_position(job):
+    # Runs in a pool process. A fresh AI per position keeps fixed-depth results
+    # independent of which worker got which job, so reruns and resumes match.
+    fen, moves, depth, think_time = job
+    board = chess.Board(fen)
+    for uci in moves:
+        board.push_uci(uci)
+    result = {"fen": board.fen(), "score": 0, "best": None, "pv": [], "depth": 0, "nodes": 0, "time": 0.0}
+    if board.is_game_over():
+        result["score"] = evaluate(board)
+        return result
+    ai = AI(book_path=None, seed=0)
+    start = time.perf_counter()
+    score, move = ai.search(board, max_depth=depth, think_time=think_time)
+    result.update({
+        "score": score,
+        "best": move.uci() if move else None,
+        "pv": [pv_move.uci() for pv_move in ai.last_pv],
+        "depth": ai.last_depth,
+        "nodes": ai.last_stats.total_nodes(),
+        "time": time.perf_counter() - start,
+    })
+    ai.close()
+    return result
+
+def analyse_records(records, depth, think_time, workers=1, max_pending=None):
+    # Yields (record, results) in input order. At most `max_pending` positions
+    # are queued or running at once, so reading never runs far ahead of writing.
+    if workers <= 1:
+        for record in records:
+            yield record, [analyse_position(job) for job in record_jobs(record, depth, think_time)]
+        return
+    max_pending = max_pending or workers * 4
+    pending = deque()
+    def collect():
+        record, future = pending.popleft()
+        if future is not None:
+            record["results"].append(future.result())
+        if len(record["results"]) == record["jobs"]:
+            return record, record.pop("results")
+        return None
+    executor = ProcessPoolExecutor(workers)
+    try:
+        for record in records:
+            jobs = record_jobs(record, depth, think_time)
+            record["results"] = []
+            record["jobs"] = len(jobs)
+            if not jobs:
+                # Queued like a job, so it still comes out in input order.
+                pending.append((record, None))
+            for job in jobs:
+                while len(pending) >= max_pending:
+                    done = collect()
+                    if done:
+                        yield done
+                pending.append((record, executor.submit(analyse_position, job)))
+        while pending:
+            done = collect()
+            if done:
+                yield done
+    finally:
+        # Stopped early (interrupt, error): drop the queue, only wait for running jobs.
+        for _, future in pending:
+            if future is not None:
+                future.cancel()
+        executor.shutdown()
+
+def eval_comment(score):
+    return f"[%eval {score / 100:.2f}]"
+
+def annotate_game(game, results, annotator):
+    # results[ply] is the analysis of the position before mainline move `ply`.
+    game.headers["Annotator"] = annotator
+    node = game
+    for ply, child in enumerate(game.mainline()):
+        best = results[ply]["best"]
+        if best and best != child.move.uci():
+            variation = node.add_variation(chess.Move.from_uci(best))
+            variation.comment = eval_comment(results[ply]["score"])
+        child.comment = " ".join(filter(None, [child.comment, eval_comment(results[ply + 1]["score"])]))
+        node = child
+    return game
+
+def position_game(record, result, annotator):
+    board, operations = parse_position(record["epd"])
+    game = chess.pgn.Game()
+    game.setup(board)
+    game.headers["Annotator"] = annotator
+    if "id" in operations:
+        game.headers["Event"] = str(operations["id"])
+    if result["best"]:
+        game.add_main_variation(chess.Move.from_uci(result["best"]), comment=eval_comment(result["score"]))
+    else:
+        game.comment = eval_comment(result["score"])
+    return game
+
+def error_game(record, annotator):
+    # Stands in for a record that could not be analysed; its headers (not a
+    # broken FEN) are kept and the reason goes in the comment.
+    game = chess.pgn.Game()
+    if "game" in record:
+        for name, value in record["game"].headers.items():
+            if name not in ("FEN", "SetUp"):
+                game.headers[name] = value
+    game.headers["Annotator"] = annotator
+    game.comment = f"not analysed: {record['error']}"
+    return game
+
+def write_record(handle, record, results, output_format, annotator):
+    if "error" in record:
+        if output_format == "jsonl":
+            handle.write(json.dumps({"source": record["source"], "record": record["index"], "error": record["error"]}) + "\n")
+        else:
+            handle.write(str(error_game(record, annotator)) + "\n\n")
+        return
+    if output_format == "jsonl":
+        moves = [move.uci() for move in record["game"].mainline_moves()] if "game" in record else []
+        for ply, result in enumerate(results):
+            line = {"source": record["source"], "record": record["index"], "ply": ply}
+            if "game" in record:
+                line["played"] = moves[ply] if ply < len(moves) else None
+            else:
+                operations = parse_position(record["epd"])[1]
+                if "id" in operations:
+                    line["id"] = str(operations["id"])
+            line.update(result)
+            handle.write(json.dumps(line) + "\n")
+        return
+    if "game" in record:
+        game = annotate_game(record["game"], results, annotator)
+    else:
+        game = position_game(record, results[0], annotator)
+    handle.write(str(game) + "\n\n")
+
+def load_checkpoint(path):
+    try:
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+def save_checkpoint(path, state):
+    # Written aside and renamed, so a crash never leaves half a checkpoint.
+    temporary = path + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as handle:
+        json.dump(state, handle)
+    os.replace(temporary, path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Annotate PGN games or EPD/FEN positions with the AI's evaluation and best move.")
+    parser.add_argument("inputs", nargs="+", help="PGN files, or FEN/EPD files with one position per line")
+    parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    parser.add_argument("--format", choices=["pgn", "jsonl"], help="output format (default: from the output extension, else pgn)")
+    parser.add_argument("--depth", type=int, help="search depth per position (default: 3 unless --time is given)")
+    parser.add_argument("--time", type=float, help="seconds per position")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="parallel search processes")
+    parser.add_argument("--max-pending", type=int, help="positions queued or running at once (default: 4 per worker)")
+    parser.add_argument("--checkpoint", help="progress file (default: OUTPUT.checkpoint)")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint of an interrupted run")
+    args = parser.parse_args(argv)
+    output_format = args.format or ("jsonl" if args.output and args.output.endswith(".jsonl") else "pgn")
+    depth = args.depth if args.depth is not None or args.time else 3
+    if (args.resume or args.checkpoint) and not args.output:
+        parser.error("--resume and --checkpoint need --output")
+    checkpoint = args.checkpoint or args.output + ".checkpoint" if args.output else None
+    settings = {"inputs": args.inputs, "format": output_format, "depth": depth, "time": args.time}
+    annotator = f"chess_game_modules.analysis depth {depth}" if depth else f"chess_game_modules.analysis {args.time}s"
+    skip = 0
+    state = load_checkpoint(checkpoint) if args.resume else None
+    if state is not None:
+        if state["settings"] != settings:
+            parser.error(f"{checkpoint} was written for {state['settings']}, not {settings}")
+        skip = state["records"]
+        handle = open(args.output, "r+", encoding="utf-8", newline="")
+        handle.seek(state["output_bytes"])
+        handle.truncate()
+    elif args.output:
+        handle = open(args.output, "w", encoding="utf-8", newline="")
+    else:
+        handle = sys.stdout
+    records, positions, nodes, errors = skip, 0, 0, 0
+    written = handle.tell() if checkpoint else 0
+    start = last_save = time.time()
+    def save():
+        # Only whole records count; a resume truncates the output back to `written`.
+        if checkpoint:
+            save_checkpoint(checkpoint, {"settings": settings, "records": records, "output_bytes": written})
+    analysis = analyse_records(read_records(args.inputs, skip), depth, args.time, args.workers, args.max_pending)
+    try:
+        for record, results in analysis:
+            write_record(handle, record, results, output_format, annotator)
+            records += 1
+            errors += "error" in record
+            positions += len(results)
+            nodes += sum(result["nodes"] for result in results)
+            if checkpoint:
+                handle.flush()
+                written = handle.tell()
+                if time.time() - last_save >= CHECKPOINT_INTERVAL:
+                    save()
+                    last_save = time.time()
+    except KeyboardInterrupt:
+        print(f"interrupted after {records} records; rerun with --resume to continue", file=sys.stderr)
+        return 130
+    finally:
+        analysis.close()
+        save()
+        if handle is not sys.stdout:
+            handle.close()
+    elapsed = time.time() - start
+    print(f"{records} records, {positions} positions in {elapsed:.1f}s ({nodes / elapsed if elapsed else 0:.0f} nps)", file=sys.stderr)
+    if errors:
+        print(f"{errors} records could not be analysed and are marked as such in the output", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+import chess
+import numpy as np
+from .ai import PST_SCORES, CENTER_SQUARES, CENTER_CONTROL_BONUS
+from .pawns import DOUBLED_PAWN_PENALTY, ISOLATED_PAWN_PENALTY
+
+# Vectorised versions of the position-only terms of ai.evaluate, for scoring
+# large position sets offline. A batch is an (N, 12) uint64 array holding one
+# bitboard per (colour, piece type), in PLANES order.
+PLANES = [(color, piece_type) for color in (chess.WHITE, chess.BLACK) for piece_type in chess.PIECE_TYPES]
+
+def plane_index(color, piece_type):
+    return piece_type - 1 + (0 if color == chess.WHITE else 6)
+
+# PST sum for every (plane, byte of the bitboard, byte value), so material is a table gather.
+PST_BYTES = np.array([
+    [[sum(PST_SCORES[color][piece_type][8 * k + bit] for bit in range(8) if value >> bit & 1) for value in range(256)]
+     for k in range(8)]
+    for color, piece_type in PLANES
+], dtype=np.int64)
+FILE_MASKS = np.array(chess.BB_FILES, dtype=np.uint64)
+BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+ORTHOGONAL = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+DIAGONAL = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+def popcount(bitboards):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bitboards).astype(np.int64)
+    as_bytes = bitboards[..., None].view(np.uint8)
+    return BYTE_POPCOUNT[as_bytes].sum(axis=-1, dtype=np.int64)
+
+def ray(square, file_step, rank_step):
+    squares = []
+    file, rank = chess.square_file(square) + file_step, chess.square_rank(square) + rank_step
+    while 0 <= file < 8 and 0 <= rank < 8:
+        squares.append(chess.square(file, rank))
+        file, rank = file + file_step, rank + rank_step
+    return squares
+
+def pack_boards(boards):
+    raw = np.array(
+        [(board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings,
+          board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]) for board in boards],
+        dtype=np.uint64,
+    ).reshape(-1, 8)
+    pieces = raw[:, :6]
+    return np.concatenate([pieces & raw[:, 6:7], pieces & raw[:, 7:8]], axis=1)
+
+def material_terms(bitboards):
+    as_bytes = bitboards.astype("<u8").view(np.uint8).reshape(-1, 12, 8)
+    return PST_BYTES[np.arange(12)[:, None], np.arange(8)[None, :], as_bytes].sum(axis=(1, 2))
+
+def pawn_penalty(pawns):
+    counts = popcount(pawns[:, None] & FILE_MASKS[None, :])
+    occupied = counts > 0
+    doubled = counts.sum(axis=1) - occupied.sum(axis=1)
+    neighbours = np.zeros_like(occupied)
+    neighbours[:, 1:] |= occupied[:, :-1]
+    neighbours[:, :-1] |= occupied[:, 1:]
+    isolated = (occupied & ~neighbours).sum(axis=1)
+    return doubled * DOUBLED_PAWN_PENALTY + isolated * ISOLATED_PAWN_PENALTY
+
+def pawn_terms(bitboards):
+    white = bitboards[:, plane_index(chess.WHITE, chess.PAWN)]
+    black = bitboards[:, plane_index(chess.BLACK, chess.PAWN)]
+    return pawn_penalty(black) - pawn_penalty(white)
+
+def slider_attackers(occupied, sliders, square, directions):
+    # Walk each ray outwards; only the first occupied square can attack `square`.
+    count = np.zeros(occupied.shape[0], dtype=np.int64)
+    for file_step, rank_step in directions:
+        blocked = np.zeros(occupied.shape[0], dtype=bool)
+        for sq in ray(square, file_step, rank_step):
+            bit = np.uint64(1 << sq)
+            count += ~blocked & ((sliders & bit) != 0)
+            blocked |= (occupied & bit) != 0
+    return count
+
+def attacker_counts(bitboards, occupied, color, square):
+    def plane(piece_type):
+        return bitboards[:, plane_index(color, piece_type)]
+    # A pawn of `color` attacks `square` from where an opposite pawn on it would attack.
+    leapers = ((plane(chess.PAWN) & np.uint64(chess.BB_PAWN_ATTACKS[not color][square]))
+               | (plane(chess.KNIGHT) & np.uint64(chess.BB_KNIGHT_ATTACKS[square]))
+               | (plane(chess.KING) & np.uint64(chess.BB_KING_ATTACKS[square])))
+    count = popcount(leapers)
+    count += slider_attackers(occupied, plane(chess.ROOK) | plane(chess.QUEEN), square, ORTHOGONAL)
+    count += slider_attackers(occupied, plane(chess.BISHOP) | plane(chess.QUEEN), square, DIAGONAL)
+    return count
+
+def center_terms(bitboards):
+    occupied = np.bitwise_or.reduce(bitboards, axis=1)
+    score = np.zeros(bitboards.shape[0], dtype=np.int64)
+    for square in CENTER_SQUARES:
+        white = attacker_counts(bitboards, occupied, chess.WHITE, square)
+        black = attacker_counts(bitboards, occupied, chess.BLACK, square)
+        score += (white - black) * CENTER_CONTROL_BONUS
+    return score
+
+def evaluate_terms(boards):
+    bitboards = pack_boards(boards)
+    return {
+        "material": material_terms(bitboards),
+        "pawns": pawn_terms(bitboards),
+        "center": center_terms(bitboards),
+    }
+
+def evaluate_batch(boards, chunk_size=8192):
+    # Sum of the covered terms: equal to ai.material_score + pawn_structure +
+    # center_control for each board. Mobility, king safety and game-over
+    # scoring still need the scalar evaluate.
+    boards = list(boards)
+    scores = np.empty(len(boards), dtype=np.int64)
+    for start in range(0, len(boards), chunk_size):
+        terms = evaluate_terms(boards[start:start + chunk_size])
+        scores[start:start + chunk_size] = terms["material"] + terms["pawns"] + terms["center"]
+    return scores
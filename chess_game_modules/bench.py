@@ -0,0 +1,227 @@
+import argparse
+import json
+import subprocess
+import sys
+import time
+import chess
+from .ai import AI, PST_SCORES
+from . import position
+
+POSITIONS_PATH = "bench/positions.epd"
+BASELINE_PATH = "bench/baseline.json"
+
+# Standard perft positions with their known leaf counts for depth 1, 2, 3, ...
+PERFT_POSITIONS = [
+    ("startpos", chess.STARTING_FEN, [20, 400, 8902, 197281]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", [48, 2039, 97862]),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238]),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", [6, 264, 9467, 422333]),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", [44, 1486, 62379]),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10", [46, 2079, 89890]),
+]
+
+# Modules a headless process (engine, analysis or pool worker) imports at startup.
+STARTUP_MODULES = ["chess_game_modules.ai", "chess_game_modules.engine", "chess_game_modules.selfplay"]
+
+def perft(board, depth):
+    if depth == 1:
+        return board.legal_moves.count()
+    nodes = 0
+    for move in board.legal_moves:
+        board.push(move)
+        nodes += perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+def load_positions(path):
+    with open(path, encoding="utf-8") as handle:
+        return [line.strip() for line in handle if line.strip() and not line.startswith("#")]
+
+def run_perft(max_depth):
+    # python-chess and the search's own move generator (position.Position) side by side.
+    results = []
+    for name, fen, counts in PERFT_POSITIONS:
+        depth = min(max_depth, len(counts))
+        start = time.perf_counter()
+        nodes = perft(chess.Board(fen), depth)
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        native_nodes = position.perft(position.Position(chess.Board(fen), PST_SCORES), depth)
+        native_elapsed = time.perf_counter() - start
+        results.append({"name": name, "depth": depth, "nodes": nodes, "expected": counts[depth - 1], "time": elapsed,
+                        "native_nodes": native_nodes, "native_time": native_elapsed})
+    return results
+
+def run_startup(runs):
+    # Import cost in fresh interpreters, best of `runs`, and whether pygame came along.
+    code = ("import sys, time; start = time.perf_counter(); "
+            + "; ".join(f"import {module}" for module in STARTUP_MODULES)
+            + "; print(time.perf_counter() - start, 'pygame' in sys.modules)")
+    best, pygame = None, False
+    for _ in range(runs):
+        seconds, loaded = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split()
+        best = float(seconds) if best is None else min(best, float(seconds))
+        pygame = pygame or loaded == "True"
+    return {"modules": STARTUP_MODULES, "time": best, "pygame": pygame}
+
+def run_search(fens, depth, options):
+    # A fresh AI per position, so every result is independent of the run order.
+    results = []
+    for fen in fens:
+        ai = AI(book_path=None, seed=0, **options)
+        board = chess.Board(fen)
+        start = time.perf_counter()
+        score, move = ai.search(board, max_depth=depth)
+        elapsed = time.perf_counter() - start
+        stats = ai.last_stats
+        nodes = stats.total_nodes()
+        ai.close()
+        results.append({
+            "fen": fen,
+            "depth": depth,
+            "nodes": nodes,
+            "time": elapsed,
+            "nps": nodes / elapsed if elapsed > 0 else 0.0,
+            "move": move.uci() if move else None,
+            "score": score,
+            "stats": stats.as_dict(),
+        })
+    return results
+
+def totals(results):
+    nodes = sum(r["nodes"] for r in results)
+    seconds = sum(r["time"] for r in results)
+    cutoffs = sum(r["stats"]["cutoffs"] for r in results)
+    first = sum(r["stats"]["first_move_cutoffs"] for r in results)
+    return {
+        "nodes": nodes,
+        "time": seconds,
+        "nps": nodes / seconds if seconds > 0 else 0.0,
+        "first_move_cutoff_rate": first / cutoffs if cutoffs else 0.0,
+        "branching_factor": sum(r["stats"]["branching_factor"] for r in results) / len(results) if results else 0.0,
+    }
+
+def run_bench(fens, depth, perft_depth, startup_runs=5, options=None):
+    options = options or {}
+    search = run_search(fens, depth, options)
+    return {
+        "depth": depth,
+        "options": options,
+        "startup": run_startup(startup_runs) if startup_runs > 0 else None,
+        "perft": run_perft(perft_depth) if perft_depth > 0 else [],
+        "search": search,
+        "totals": totals(search),
+    }
+
+def tree_options(options):
+    # native only changes the board the search runs on, not the tree: node
+    # counts still compare across it, times don't.
+    return {name: value for name, value in options.items() if name != "native"}
+
+def compare(report, baseline, node_threshold, time_threshold):
+    # Human-readable failures; an empty list means the run passes.
+    failures = []
+    for result in report["perft"]:
+        if result["nodes"] != result["expected"]:
+            failures.append(f"perft {result['name']} depth {result['depth']}: {result['nodes']} nodes, expected {result['expected']}")
+        if result["native_nodes"] != result["expected"]:
+            failures.append(f"native perft {result['name']} depth {result['depth']}: {result['native_nodes']} nodes, expected {result['expected']}")
+    startup = report["startup"]
+    if startup is not None and startup["pygame"]:
+        failures.append("importing " + ", ".join(startup["modules"]) + " loaded pygame")
+    if baseline is None:
+        return failures
+    old_startup = baseline.get("startup")
+    if startup is not None and old_startup and time_threshold is not None and startup["time"] > old_startup["time"] * (1 + time_threshold):
+        failures.append(f"headless import {startup['time'] * 1000:.0f}ms vs baseline {old_startup['time'] * 1000:.0f}ms")
+    if baseline["depth"] != report["depth"]:
+        failures.append(f"baseline was recorded at depth {baseline['depth']}, this run used depth {report['depth']}")
+        return failures
+    if tree_options(baseline.get("options", {})) != tree_options(report["options"]):
+        failures.append(f"baseline was recorded with options {baseline.get('options', {})}, this run used {report['options']}")
+        return failures
+    if baseline.get("options", {}).get("native", True) != report["options"].get("native", True):
+        time_threshold = None
+    old, new = baseline["totals"], report["totals"]
+    if new["nodes"] > old["nodes"] * (1 + node_threshold):
+        failures.append(f"search nodes {new['nodes']} vs baseline {old['nodes']} ({new['nodes'] / old['nodes'] - 1:+.1%})")
+    if time_threshold is not None and new["time"] > old["time"] * (1 + time_threshold):
+        failures.append(f"search time {new['time']:.2f}s vs baseline {old['time']:.2f}s ({new['time'] / old['time'] - 1:+.1%})")
+    return failures
+
+def changes(report, baseline):
+    # Per-position differences worth a look even when the totals pass.
+    if baseline is None or baseline["depth"] != report["depth"] or tree_options(baseline.get("options", {})) != tree_options(report["options"]):
+        return []
+    previous = {r["fen"]: r for r in baseline["search"]}
+    lines = []
+    for result in report["search"]:
+        old = previous.get(result["fen"])
+        if old is None:
+            continue
+        if old["move"] != result["move"]:
+            lines.append(f"{result['fen']}: move {old['move']} -> {result['move']}")
+        if old["nodes"] != result["nodes"]:
+            lines.append(f"{result['fen']}: nodes {old['nodes']} -> {result['nodes']}")
+    return lines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run perft and the fixed-depth search bench, and compare against a stored baseline.")
+    parser.add_argument("--positions", default=POSITIONS_PATH, help="FEN file of bench positions")
+    parser.add_argument("--depth", type=int, default=3, help="search depth for every bench position")
+    parser.add_argument("--perft-depth", type=int, default=4, help="maximum perft depth (0 skips perft)")
+    parser.add_argument("--no-null-move", action="store_true", help="search without null-move pruning")
+    parser.add_argument("--no-lmr", action="store_true", help="search without late-move reductions")
+    parser.add_argument("--no-native", action="store_true", help="search the python-chess board instead of the native position")
+    parser.add_argument("--startup-runs", type=int, default=5, help="fresh interpreters for the import-time check (0 skips it)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("-o", "--output", help="write the full JSON report here")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--node-threshold", type=float, default=0.02, help="allowed relative increase in total search nodes")
+    parser.add_argument("--time-threshold", type=float, default=0.25, help="allowed relative increase in total search time")
+    parser.add_argument("--no-time-check", action="store_true", help="gate on node counts only, e.g. on a different machine")
+    parser.add_argument("-v", "--verbose", action="store_true", help="list per-position changes against the baseline")
+    args = parser.parse_args(argv)
+    options = {}
+    if args.no_null_move:
+        options["null_move"] = False
+    if args.no_lmr:
+        options["lmr"] = False
+    if args.no_native:
+        options["native"] = False
+    report = run_bench(load_positions(args.positions), args.depth, args.perft_depth, args.startup_runs, options)
+    if report["startup"] is not None:
+        startup = report["startup"]
+        print(f"headless import: {startup['time'] * 1000:.0f}ms{', pygame loaded' if startup['pygame'] else ''}")
+    for result in report["perft"]:
+        print(f"perft {result['name']} depth {result['depth']}: {result['nodes']} nodes in {result['time']:.2f}s (native {result['native_nodes']} in {result['native_time']:.2f}s)")
+    summary = report["totals"]
+    print(f"search depth {args.depth}: {len(report['search'])} positions, {summary['nodes']} nodes in {summary['time']:.2f}s ({summary['nps']:.0f} nps)")
+    print(f"first-move cutoffs {summary['first_move_cutoff_rate']:.1%}, mean branching factor {summary['branching_factor']:.2f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=1)
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=1)
+        print(f"baseline written to {args.baseline}")
+        return 0
+    try:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+    except FileNotFoundError:
+        print(f"no baseline at {args.baseline}; run with --update-baseline to create one")
+        baseline = None
+    if baseline is not None:
+        old = baseline["totals"]
+        print(f"baseline: {old['nodes']} nodes in {old['time']:.2f}s ({old['nps']:.0f} nps)")
+    if args.verbose:
+        for line in changes(report, baseline):
+            print(line)
+    failures = compare(report, baseline, args.node_threshold, None if args.no_time_check else args.time_threshold)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
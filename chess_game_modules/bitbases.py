@@ -0,0 +1,237 @@
+import argparse
+import mmap
+import os
+from collections import deque
+import chess
+
+BITBASE_DIR = "bitbases"
+BITBASE_WIN = 10_000
+# Won KPK scores sit this far below the queen and rook endings (whose mop-up
+# term is 0..108, the pawn term at most 115), so promoting always gains.
+KPK_OFFSET = 200
+ENDGAMES = {"KQK": chess.QUEEN, "KRK": chess.ROOK, "KPK": chess.PAWN}
+# KPK wins through promotion, so it is solved after the tables it promotes into.
+GENERATION_ORDER = ["KQK", "KRK", "KPK"]
+STRONG_TO_MOVE = 0
+WEAK_TO_MOVE = 1
+POSITIONS = 2 * 64 * 64 * 64
+TABLE_BYTES = POSITIONS // 8
+
+# Positions are always stored with the strong side as White; a Black strong
+# side is mirrored vertically before probing.
+def position_index(stm, strong_king, weak_king, piece):
+    return ((stm * 64 + strong_king) * 64 + weak_king) * 64 + piece
+
+def split_index(index):
+    piece = index & 63
+    weak_king = (index >> 6) & 63
+    strong_king = (index >> 12) & 63
+    return index >> 18, strong_king, weak_king, piece
+
+def piece_attacks(piece_type, square, occupied):
+    if piece_type == chess.PAWN:
+        return chess.BB_PAWN_ATTACKS[chess.WHITE][square]
+    attacks = 0
+    if piece_type in (chess.ROOK, chess.QUEEN):
+        attacks |= (chess.BB_RANK_ATTACKS[square][chess.BB_RANK_MASKS[square] & occupied]
+                    | chess.BB_FILE_ATTACKS[square][chess.BB_FILE_MASKS[square] & occupied])
+    if piece_type == chess.QUEEN:
+        attacks |= chess.BB_DIAG_ATTACKS[square][chess.BB_DIAG_MASKS[square] & occupied]
+    return attacks
+
+def strong_attacks(piece_type, strong_king, piece, occupied):
+    return chess.BB_KING_ATTACKS[strong_king] | piece_attacks(piece_type, piece, occupied)
+
+def is_valid(piece_type, stm, strong_king, weak_king, piece):
+    if strong_king == weak_king or piece == strong_king or piece == weak_king:
+        return False
+    if chess.BB_KING_ATTACKS[strong_king] & chess.BB_SQUARES[weak_king]:
+        return False
+    if piece_type == chess.PAWN and chess.BB_SQUARES[piece] & chess.BB_BACKRANKS:
+        return False
+    if stm == STRONG_TO_MOVE:
+        occupied = chess.BB_SQUARES[strong_king] | chess.BB_SQUARES[weak_king] | chess.BB_SQUARES[piece]
+        if strong_attacks(piece_type, strong_king, piece, occupied) & chess.BB_SQUARES[weak_king]:
+            return False
+    return True
+
+def weak_king_moves(piece_type, strong_king, weak_king, piece):
+    # Returns (quiet legal destinations, can capture the piece, in check).
+    occupied = chess.BB_SQUARES[strong_king] | chess.BB_SQUARES[piece]
+    attacked = strong_attacks(piece_type, strong_king, piece, occupied)
+    in_check = bool(attacked & chess.BB_SQUARES[weak_king])
+    targets = chess.BB_KING_ATTACKS[weak_king] & ~attacked & ~chess.BB_SQUARES[strong_king]
+    capture = bool(targets & chess.BB_SQUARES[piece]) and not chess.BB_KING_ATTACKS[strong_king] & chess.BB_SQUARES[piece]
+    return list(chess.scan_forward(targets & ~chess.BB_SQUARES[piece])), capture, in_check
+
+def strong_unmoves(piece_type, strong_king, weak_king, piece):
+    # Positions with the strong side to move that reach this one by a quiet move.
+    occupied = chess.BB_SQUARES[strong_king] | chess.BB_SQUARES[weak_king] | chess.BB_SQUARES[piece]
+    for square in chess.scan_forward(chess.BB_KING_ATTACKS[strong_king] & ~occupied):
+        yield square, piece
+    if piece_type == chess.PAWN:
+        below = piece - 8
+        if below >= chess.A2 and not occupied & chess.BB_SQUARES[below]:
+            yield strong_king, below
+            if chess.square_rank(piece) == 3 and not occupied & chess.BB_SQUARES[below - 8]:
+                yield strong_king, below - 8
+        return
+    for square in chess.scan_forward(piece_attacks(piece_type, piece, occupied) & ~occupied):
+        yield strong_king, square
+
+def solve(piece_type, promotion_tables=None):
+    win = bytearray(POSITIONS)
+    counters = [0] * (POSITIONS // 2)
+    queue = deque()
+    offset = WEAK_TO_MOVE << 18
+    for index in range(offset, POSITIONS):
+        _, strong_king, weak_king, piece = split_index(index)
+        if not is_valid(piece_type, WEAK_TO_MOVE, strong_king, weak_king, piece):
+            continue
+        moves, capture, in_check = weak_king_moves(piece_type, strong_king, weak_king, piece)
+        if capture:
+            continue
+        if not moves:
+            if in_check:
+                win[index] = 1
+                queue.append(index)
+            continue
+        counters[index - offset] = len(moves)
+    if promotion_tables:
+        for piece in chess.SQUARES[chess.A7:chess.H7 + 1]:
+            for strong_king in chess.SQUARES:
+                for weak_king in chess.SQUARES:
+                    index = position_index(STRONG_TO_MOVE, strong_king, weak_king, piece)
+                    if win[index] or not is_valid(piece_type, STRONG_TO_MOVE, strong_king, weak_king, piece):
+                        continue
+                    if piece + 8 in (strong_king, weak_king):
+                        continue
+                    after = position_index(WEAK_TO_MOVE, strong_king, weak_king, piece + 8)
+                    if any(table[after] for table in promotion_tables):
+                        win[index] = 1
+                        queue.append(index)
+    while queue:
+        index = queue.popleft()
+        stm, strong_king, weak_king, piece = split_index(index)
+        if stm == WEAK_TO_MOVE:
+            for king, square in strong_unmoves(piece_type, strong_king, weak_king, piece):
+                before = position_index(STRONG_TO_MOVE, king, weak_king, square)
+                if not win[before] and is_valid(piece_type, STRONG_TO_MOVE, king, weak_king, square):
+                    win[before] = 1
+                    queue.append(before)
+        else:
+            occupied = chess.BB_SQUARES[strong_king] | chess.BB_SQUARES[piece]
+            for square in chess.scan_forward(chess.BB_KING_ATTACKS[weak_king] & ~occupied):
+                before = position_index(WEAK_TO_MOVE, strong_king, square, piece)
+                if counters[before - offset] > 0 and is_valid(piece_type, WEAK_TO_MOVE, strong_king, square, piece):
+                    counters[before - offset] -= 1
+                    if counters[before - offset] == 0:
+                        win[before] = 1
+                        queue.append(before)
+    return win
+
+def pack_bits(win):
+    packed = bytearray(TABLE_BYTES)
+    for index in range(POSITIONS):
+        if win[index]:
+            packed[index >> 3] |= 1 << (index & 7)
+    return packed
+
+def generate(directory=BITBASE_DIR, names=GENERATION_ORDER):
+    os.makedirs(directory, exist_ok=True)
+    needed = set(names)
+    if "KPK" in needed:
+        needed.update(("KQK", "KRK"))
+    solved = {}
+    for name in GENERATION_ORDER:
+        if name not in needed:
+            continue
+        promotion_tables = [solved["KQK"], solved["KRK"]] if name == "KPK" else None
+        solved[name] = solve(ENDGAMES[name], promotion_tables)
+        if name in names:
+            with open(os.path.join(directory, f"{name}.bb"), "wb") as handle:
+                handle.write(pack_bits(solved[name]))
+    return solved
+
+def center_distance(square):
+    file, rank = chess.square_file(square), chess.square_rank(square)
+    return max(3 - file, file - 4) + max(3 - rank, rank - 4)
+
+class Bitbases:
+    def __init__(self, directory=BITBASE_DIR):
+        self.tables = {}
+        for name, piece_type in ENDGAMES.items():
+            path = os.path.join(directory, f"{name}.bb")
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as handle:
+                table = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(table) != TABLE_BYTES:
+                table.close()
+                raise IOError(f"invalid bitbase size: {path!r}")
+            self.tables[piece_type] = table
+    @classmethod
+    def open(cls, directory=BITBASE_DIR):
+        if directory and os.path.isdir(directory):
+            bitbases = cls(directory)
+            if bitbases.tables:
+                return bitbases
+        return None
+    def close(self):
+        for table in self.tables.values():
+            table.close()
+        self.tables = {}
+    def probe(self, board):
+        # True for a win for the side with the extra piece, False for a draw,
+        # None when the position is not covered.
+        result = self.lookup(board)
+        return None if result is None else result[0]
+    def lookup(self, board):
+        if chess.popcount(board.occupied) != 3:
+            return None
+        for piece_type, table in self.tables.items():
+            mask = board.pieces_mask(piece_type, chess.WHITE) | board.pieces_mask(piece_type, chess.BLACK)
+            if mask:
+                break
+        else:
+            return None
+        piece = chess.lsb(mask)
+        strong = board.color_at(piece)
+        strong_king, weak_king = board.king(strong), board.king(not strong)
+        if strong == chess.BLACK:
+            strong_king, weak_king, piece = (chess.square_mirror(sq) for sq in (strong_king, weak_king, piece))
+        index = position_index(STRONG_TO_MOVE if board.turn == strong else WEAK_TO_MOVE, strong_king, weak_king, piece)
+        return bool(table[index >> 3] >> (index & 7) & 1), strong, strong_king, weak_king, piece
+    def evaluate(self, board):
+        # White-relative score: 0 for a draw, BITBASE_WIN plus a mop-up term for a
+        # win so that search still makes progress towards mate.
+        result = self.lookup(board)
+        if result is None:
+            return None
+        won, strong, strong_king, weak_king, piece = result
+        if not won:
+            return 0
+        if board.is_checkmate():
+            return None
+        if chess.BB_SQUARES[piece] & board.pawns:
+            progress = chess.square_rank(piece) * 20 - chess.square_distance(strong_king, piece) * 5 - KPK_OFFSET
+        else:
+            progress = center_distance(weak_king) * 10 + (14 - chess.square_manhattan_distance(strong_king, weak_king)) * 4
+        score = BITBASE_WIN + progress
+        return score if strong == chess.WHITE else -score
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Retrograde-solve KQK, KRK and KPK into bit-packed win/draw tables.")
+    parser.add_argument("endgames", nargs="*", help="tables to build: KQK, KRK, KPK (default: all)")
+    parser.add_argument("-o", "--output", default=BITBASE_DIR, help=f"directory to write tables to (default: {BITBASE_DIR})")
+    args = parser.parse_args(argv)
+    names = args.endgames or GENERATION_ORDER
+    for name in names:
+        if name not in ENDGAMES:
+            parser.error(f"unknown endgame {name!r}")
+    generate(args.output, names)
+    for name in names:
+        print(f"Wrote {os.path.join(args.output, name + '.bb')}")
+
+if __name__ == "__main__":
+    main()
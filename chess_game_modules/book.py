@@ -0,0 +1,101 @@
+import argparse
+import os
+import random
+import struct
+from collections import defaultdict
+import chess
+import chess.polyglot
+
+BOOK_PATH = os.path.join("books", "book.bin")
+ENTRY_STRUCT = struct.Struct(">QHHI")
+MAX_WEIGHT = 0xFFFF
+RESULT_WEIGHTS = {"1-0": (2, 0), "0-1": (0, 2), "1/2-1/2": (1, 1)}
+
+class OpeningBook:
+    # Polyglot layout: 16-byte big-endian entries sorted by Zobrist key. The
+    # python-chess reader mmaps the file and bisects it, so nothing is parsed
+    # until a position is probed.
+    def __init__(self, path):
+        self.path = path
+        self.reader = chess.polyglot.open_reader(path)
+    @classmethod
+    def open(cls, path=BOOK_PATH):
+        if path and os.path.exists(path):
+            return cls(path)
+        return None
+    def choose(self, board, rng=None):
+        try:
+            return self.reader.weighted_choice(board, random=rng or random).move
+        except IndexError:
+            return None
+    def close(self):
+        self.reader.close()
+
+def encode_move(board, move):
+    # Polyglot stores castling as "king takes own rook" and promotions as knight=1..queen=4.
+    to_square = move.to_square
+    if board.is_castling(move):
+        rank = chess.square_rank(move.from_square)
+        to_square = chess.square(7 if board.is_kingside_castling(move) else 0, rank)
+    promotion = move.promotion - 1 if move.promotion else 0
+    return (chess.square_file(to_square)
+            | chess.square_rank(to_square) << 3
+            | chess.square_file(move.from_square) << 6
+            | chess.square_rank(move.from_square) << 9
+            | promotion << 12)
+
+def collect_moves(pgn_paths, max_ply, counts=None):
+    # chess.pgn drags in chess.engine; only the book builder needs it, not the AI.
+    import chess.pgn
+    counts = counts if counts is not None else defaultdict(int)
+    for path in pgn_paths:
+        with open(path, encoding="utf-8", errors="replace") as handle:
+            while True:
+                game = chess.pgn.read_game(handle)
+                if game is None:
+                    break
+                weights = RESULT_WEIGHTS.get(game.headers.get("Result"))
+                if weights is None:
+                    continue
+                board = game.board()
+                for ply, move in enumerate(game.mainline_moves()):
+                    if ply >= max_ply:
+                        break
+                    weight = weights[0] if board.turn == chess.WHITE else weights[1]
+                    counts[(chess.polyglot.zobrist_hash(board), encode_move(board, move))] += weight
+                    board.push(move)
+    return counts
+
+def write_book(counts, out_path, min_weight=1):
+    by_key = defaultdict(list)
+    for (key, raw_move), weight in counts.items():
+        if weight >= min_weight:
+            by_key[key].append((raw_move, weight))
+    entries = []
+    for key, moves in by_key.items():
+        top = max(weight for _, weight in moves)
+        scale = MAX_WEIGHT / top if top > MAX_WEIGHT else 1
+        for raw_move, weight in moves:
+            entries.append((key, raw_move, max(1, int(weight * scale))))
+    entries.sort(key=lambda entry: (entry[0], -entry[2], entry[1]))
+    directory = os.path.dirname(out_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(out_path, "wb") as handle:
+        for key, raw_move, weight in entries:
+            handle.write(ENTRY_STRUCT.pack(key, raw_move, weight, 0))
+    return len(entries)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile a Polyglot opening book from PGN files.")
+    parser.add_argument("pgn", nargs="+", help="input PGN files")
+    parser.add_argument("-o", "--output", default=BOOK_PATH, help=f"book file to write (default: {BOOK_PATH})")
+    parser.add_argument("--max-ply", type=int, default=20, help="only record the first N plies of each game")
+    parser.add_argument("--min-weight", type=int, default=2, help="drop moves whose total weight is below this")
+    args = parser.parse_args(argv)
+    counts = collect_moves(args.pgn, args.max_ply)
+    written = write_book(counts, args.output, args.min_weight)
+    print(f"Wrote {written} entries to {args.output}")
+
+if __name__ == "__main__":
+    main()
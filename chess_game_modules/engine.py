@@ -0,0 +1,177 @@
+import sys
+import threading
+import chess
+from .ai import AI, MATE_SCORE
+
+ENGINE_NAME = "Pygame Chess AI"
+ENGINE_AUTHOR = "karlof002"
+MOVE_OVERHEAD = 0.05
+DEFAULT_MOVES_TO_GO = 30
+
+def parse_position(tokens):
+    board = chess.Board()
+    index = 0
+    if tokens and tokens[0] == "startpos":
+        index = 1
+    elif tokens and tokens[0] == "fen":
+        index = tokens.index("moves") if "moves" in tokens else len(tokens)
+        board = chess.Board(" ".join(tokens[1:index]))
+        # The search assumes a reachable position, e.g. that the side not to move is not in check.
+        if not board.is_valid():
+            raise ValueError(f"illegal position: {board.fen()}")
+    if index < len(tokens) and tokens[index] == "moves":
+        for uci in tokens[index + 1:]:
+            board.push_uci(uci)
+    return board
+
+def parse_go(tokens):
+    params = {}
+    index = 0
+    while index < len(tokens):
+        name = tokens[index]
+        if name in ("infinite", "ponder"):
+            params[name] = True
+            index += 1
+        elif index + 1 < len(tokens):
+            try:
+                params[name] = int(tokens[index + 1])
+            except ValueError:
+                pass
+            index += 2
+        else:
+            index += 1
+    return params
+
+def time_budget(params, turn):
+    # Seconds to spend on this move, or None to search until depth or "stop".
+    if params.get("infinite"):
+        return None
+    if "movetime" in params:
+        return max(0.01, params["movetime"] / 1000 - MOVE_OVERHEAD)
+    remaining = params.get("wtime" if turn == chess.WHITE else "btime")
+    if remaining is None:
+        return None
+    increment = params.get("winc" if turn == chess.WHITE else "binc", 0)
+    moves_to_go = params.get("movestogo") or DEFAULT_MOVES_TO_GO
+    budget = remaining / moves_to_go + increment * 0.75
+    return max(0.01, min(budget, remaining / 2) / 1000 - MOVE_OVERHEAD)
+
+def mate_plies(board, pv, depth):
+    # Mate scores carry no distance: count it along the PV when that ends in
+    # mate, otherwise the iteration that found it is the best bound there is.
+    board = board.copy(stack=False)
+    for move in pv:
+        board.push(move)
+    return len(pv) if board.is_checkmate() else depth
+
+def format_score(score, turn, plies=0):
+    # Scores are White-relative internally; UCI wants them from the mover's side.
+    relative = score if turn == chess.WHITE else -score
+    if abs(relative) >= MATE_SCORE:
+        moves = (plies + 1) // 2
+        return f"mate {moves if relative > 0 else -moves}"
+    return f"cp {relative}"
+
+class UCIEngine:
+    def __init__(self, output=None):
+        self.output = output or sys.stdout
+        self.output_lock = threading.Lock()
+        self.ai = AI("Hard")
+        self.board = chess.Board()
+        self.stop_event = threading.Event()
+        self.search_thread = None
+        self.infinite = False
+    def send(self, line):
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+    def handle(self, line):
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "ucinewgame":
+            self.stop()
+            self.ai.close()
+            self.ai = AI("Hard")
+        elif command == "position":
+            self.stop()
+            try:
+                self.board = parse_position(args)
+            except ValueError as error:
+                # Bad FENs and illegal moves are reported, not fatal; the previous position stays.
+                self.send(f"info string {error}")
+        elif command == "go":
+            self.stop()
+            self.go(parse_go(args))
+        elif command == "stop":
+            self.stop()
+        elif command == "quit":
+            self.stop()
+            self.ai.close()
+            return False
+        return True
+    def go(self, params):
+        board = self.board.copy()
+        # Nothing bounds the search (a bare "go", or no clock for the side to
+        # move): run it as infinite, so "stop" or closed input ends it.
+        if "depth" not in params and time_budget(params, board.turn) is None:
+            params["infinite"] = True
+        self.infinite = bool(params.get("infinite"))
+        self.stop_event.clear()
+        self.search_thread = threading.Thread(target=self.run_search, args=(board, params), daemon=True)
+        self.search_thread.start()
+    def run_search(self, board, params):
+        move = self.find_move(board, params)
+        # In infinite mode bestmove only goes out after "stop", even when the
+        # search ended early (a mate found, the depth cap reached).
+        if params.get("infinite"):
+            self.stop_event.wait()
+        self.send(f"bestmove {move.uci() if move else '0000'}")
+    def find_move(self, board, params):
+        if not any(board.legal_moves):
+            return None
+        move = None
+        if self.ai.book is not None and not params.get("infinite"):
+            move = self.ai.book.choose(board)
+        if move is None:
+            think_time = time_budget(params, board.turn)
+            max_depth = params.get("depth")
+            def report(depth, score, pv, stats, elapsed):
+                nodes = stats.total_nodes()
+                nps = int(nodes / elapsed) if elapsed > 0 else 0
+                line = " ".join(m.uci() for m in pv)
+                plies = mate_plies(board, pv, depth) if abs(score) >= MATE_SCORE else 0
+                score = format_score(score, board.turn, plies)
+                self.send(f"info depth {depth} score {score} nodes {nodes} nps {nps} time {int(elapsed * 1000)} pv {line}")
+            _, move = self.ai.search(board, max_depth=max_depth, think_time=think_time, stop_event=self.stop_event, on_iteration=report)
+            if move is None:
+                move = next(iter(board.legal_moves))
+        return move
+    def stop(self):
+        if self.search_thread is not None:
+            self.stop_event.set()
+            self.search_thread.join()
+            self.search_thread = None
+    def loop(self, stream=None):
+        for line in stream or sys.stdin:
+            if not self.handle(line.strip()):
+                return
+        # Input closed: let a bounded search report its move, cut an infinite one short.
+        if self.search_thread is not None:
+            if self.infinite:
+                self.stop()
+            else:
+                self.search_thread.join()
+
+def main():
+    UCIEngine().loop()
+
+if __name__ == "__main__":
+    main()
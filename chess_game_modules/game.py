@@ -1,9 +1,9 @@
 import pygame as pg
 import chess
 import time
-import threading
 import sys
 from .ai import AI
+from .worker import AIWorker
 from .utils import load_piece_images, lerp, ease_in_out_cubic
 from .ui import Button
 
@@ -14,6 +14,9 @@ HIGHLIGHT_SELECT = (255, 255, 0, 150)
 HIGHLIGHT_MOVE = (100, 200, 140, 150)
 ACCENT = (100, 170, 255)
 ANIM_DURATION = 0.25
+FPS = 60
+IDLE_TIMEOUT_MS = 500
+AI_RESULT_EVENT = pg.USEREVENT + 1
 PIECE_ORDER = {
     chess.PAWN: 'p',
     chess.KNIGHT: 'n',
@@ -26,7 +29,7 @@ PIECE_ORDER = {
 class Game:
     PROMOTION_PIECES = [chess.QUEEN, chess.ROOK, chess.BISHOP, chess.KNIGHT]
     PROMOTION_NAMES = {chess.QUEEN: "Queen", chess.ROOK: "Rook", chess.BISHOP: "Bishop", chess.KNIGHT: "Knight"}
-    def __init__(self, board_pixel, difficulty, player_color):
+    def __init__(self, board_pixel, difficulty, player_color, ponder=True):
         pg.init()
         self.square = board_pixel // 8
         self.screen_width = board_pixel
@@ -39,6 +42,10 @@ class Game:
         self.board = chess.Board()
         self.origin = (0, 0)
         self.pieces = load_piece_images(self.square)
+        self.select_layer = pg.Surface((self.square, self.square), pg.SRCALPHA)
+        self.select_layer.fill(HIGHLIGHT_SELECT)
+        self.move_layer = pg.Surface((self.square, self.square), pg.SRCALPHA)
+        self.move_layer.fill(HIGHLIGHT_MOVE)
         self.selected = None
         self.legal_moves = []
         self.animating = False
@@ -50,6 +57,11 @@ class Game:
         self.player_color = chess.WHITE if player_color == "White" else chess.BLACK
         self.ai_color = not self.player_color
         self.flip_board = (self.player_color == chess.BLACK)
+        self.board_layer = self.build_board_layer()
+        self.full_redraw = True
+        self.drawn_states = None
+        self.drawn_anim = None
+        self.drawn_overlay = None
         self.msg = ""
         self.game_over = False
         self.move_history = []
@@ -57,8 +69,12 @@ class Game:
         self.promotion_move_base = None
         self.promotion_buttons = []
         self.create_promotion_buttons()
-        self.ai_thread = None
-        self.ai_move_result = None
+        self.worker = AIWorker(self.ai, on_result=self.post_ai_result)
+        self.ai_job = None
+        self.ponder = ponder
+        self.ponder_job = None
+        self.ponder_move = None
+        self.ponder_start = 0
         button_width = 180
         button_height = 50
         self.game_over_button = Button(
@@ -70,9 +86,11 @@ class Game:
         self.show_game_over_popup = False
         self.running = True
     def back_to_settings(self):
+        self.cancel_ai()
         self.show_game_over_popup = False
         self.running = False
     def quit_game(self):
+        self.worker.shutdown()
         pg.quit()
         sys.exit(0)
     def create_promotion_buttons(self):
@@ -101,26 +119,53 @@ class Game:
             self.promotion_move_base = None
             self.selected = None
             self.legal_moves = []
-    def start_ai_move_thread(self):
-        def ai_task():
-            board_copy = self.board.copy()
-            move = self.ai.choose_move(board_copy)
-            self.ai_move_result = move
-        self.ai_move_result = None
-        self.ai_thread = threading.Thread(target=ai_task)
-        self.ai_thread.daemon = True
-        self.ai_thread.start()
+    def cancel_ai(self):
+        self.worker.cancel()
+        self.ai_job = None
+        self.ponder_job = None
+        self.ponder_move = None
+    def start_ponder(self):
+        # Search on the player's time: the position after the reply our last
+        # search expects, or the player's own position when there is none.
+        board = self.board.copy()
+        self.ponder_move = self.ai.expected_reply(board)
+        if self.ponder_move is not None:
+            board.push(self.ponder_move)
+            if board.is_game_over():
+                self.ponder_move = None
+                return
+        self.ponder_start = time.time()
+        self.ponder_job = self.worker.submit("ponder", board)
+    def player_moved(self, move):
+        if self.ponder_job is None:
+            return
+        if move != self.ponder_move or self.game_over:
+            # Ponder miss: its table entries stay, the search itself is wasted.
+            self.cancel_ai()
+            return
+        quick = self.ai.quick_move(self.board.copy())
+        if quick is not None:
+            self.cancel_ai()
+            self.start_move_animation(quick)
+            return
+        # Ponder hit: the running search is already on this position and has
+        # used the player's time, so it becomes the AI's move job and only
+        # gets what is left of its budget.
+        self.ai_job, self.ponder_job = self.ponder_job, None
+        self.worker.finish_in(self.ai.think_time - (time.time() - self.ponder_start), self.ai_job)
     def ai_move(self):
         if (self.animating or self.game_over or self.board.turn != self.ai_color or self.awaiting_promotion or self.show_game_over_popup):
             return
-        if self.ai_move_result:
-            move = self.ai_move_result
-            self.ai_move_result = None
-            if move and move in self.board.legal_moves:
-                self.start_move_animation(move)
-        else:
-            if not self.ai_thread or not self.ai_thread.is_alive():
-                self.start_ai_move_thread()
+        if self.ai_job is None:
+            self.ai_job = self.worker.submit("move", self.board)
+            return
+        result = self.worker.take(self.ai_job)
+        if result is None:
+            return
+        self.ai_job = None
+        _, move = result
+        if move and move in self.board.legal_moves:
+            self.start_move_animation(move)
     def start_move_animation(self, move):
         if self.animating:
             return
@@ -146,6 +191,10 @@ class Game:
             self.selected = None
             self.legal_moves = []
             self.check_game_over()
+            if self.board.turn == self.ai_color:
+                self.player_moved(self.move_history[-1])
+            elif self.ponder and not self.game_over:
+                self.start_ponder()
     def check_game_over(self):
         if self.board.is_game_over():
             if self.board.is_checkmate():
@@ -183,14 +232,23 @@ class Game:
         if 0 <= file <= 7 and 0 <= rank <= 7:
             return chess.square(file, rank)
         return None
-    def draw_board(self):
+    def square_rect(self, square):
+        file, rank = self.square_to_coords(square)
+        return pg.Rect(*self.coords_to_pos(file, rank), self.square, self.square)
+    def build_board_layer(self):
+        # Squares and labels only change with size or orientation, so they are drawn once.
+        layer = pg.Surface((self.screen_width, self.screen_height))
+        layer.fill(BG)
         for rank in range(8):
             for file in range(8):
                 color = LIGHT_SQUARE if (file + rank) % 2 == 0 else DARK_SQUARE
                 pos = self.coords_to_pos(file, rank)
-                pg.draw.rect(self.screen, color, (*pos, self.square, self.square))
-        self.draw_board_labels()
-    def draw_board_labels(self):
+                pg.draw.rect(layer, color, (*pos, self.square, self.square))
+        self.draw_board_labels(layer)
+        return layer
+    def draw_board(self, rect):
+        self.screen.blit(self.board_layer, rect, rect)
+    def draw_board_labels(self, surface):
         label_font = pg.font.SysFont("Arial", max(12, self.square // 6))
         label_color = (100, 100, 100)
         files = "abcdefgh"
@@ -200,7 +258,7 @@ class Game:
             x = self.square * i + self.square - 15
             y = self.screen_height - 15
             label = label_font.render(file_char, True, label_color)
-            self.screen.blit(label, (x, y))
+            surface.blit(label, (x, y))
         ranks = "12345678"
         if self.flip_board:
             ranks = ranks[::-1]
@@ -208,45 +266,45 @@ class Game:
             x = 5
             y = self.square * i + 5
             label = label_font.render(rank_char, True, label_color)
-            self.screen.blit(label, (x, y))
-    def draw_highlights(self):
-        s = pg.Surface((self.square, self.square), pg.SRCALPHA)
-        s.fill(HIGHLIGHT_SELECT)
+            surface.blit(label, (x, y))
+    def draw_highlights(self, rect):
         if self.selected is not None:
-            file, rank = self.square_to_coords(self.selected)
-            pos = self.coords_to_pos(file, rank)
-            self.screen.blit(s, pos)
-        s.fill(HIGHLIGHT_MOVE)
+            pos = self.square_rect(self.selected)
+            if pos.colliderect(rect):
+                self.screen.blit(self.select_layer, pos)
         for move in self.legal_moves:
-            file, rank = self.square_to_coords(move.to_square)
-            pos = self.coords_to_pos(file, rank)
-            self.screen.blit(s, pos)
-    def draw_pieces(self):
+            pos = self.square_rect(move.to_square)
+            if pos.colliderect(rect):
+                self.screen.blit(self.move_layer, pos)
+    def anim_rect(self):
+        if not self.animating or not self.anim_piece:
+            return None
+        from_file, from_rank = self.square_to_coords(self.anim_move.from_square)
+        to_file, to_rank = self.square_to_coords(self.anim_move.to_square)
+        fx, fy = self.coords_to_pos(from_file, from_rank)
+        tx, ty = self.coords_to_pos(to_file, to_rank)
+        eased_t = ease_in_out_cubic(self.anim_t)
+        return pg.Rect(int(lerp(fx, tx, eased_t)), int(lerp(fy, ty, eased_t)), self.square, self.square)
+    def draw_pieces(self, rect):
         board = self.board
         anim_move = self.anim_move if self.animating else None
-        t = self.anim_t if self.animating else 1.0
         for sq in chess.SQUARES:
             p = board.piece_at(sq)
             if p is None:
                 continue
             if anim_move and sq == anim_move.from_square:
                 continue
-            file, rank = self.square_to_coords(sq)
-            pos = self.coords_to_pos(file, rank)
+            pos = self.square_rect(sq)
+            if not pos.colliderect(rect):
+                continue
             img = self.pieces.get((PIECE_ORDER[p.piece_type], p.color))
             if img:
                 self.screen.blit(img, pos)
-        if anim_move and self.anim_piece:
-            from_file, from_rank = self.square_to_coords(anim_move.from_square)
-            to_file, to_rank = self.square_to_coords(anim_move.to_square)
-            fx, fy = self.coords_to_pos(from_file, from_rank)
-            tx, ty = self.coords_to_pos(to_file, to_rank)
-            eased_t = ease_in_out_cubic(t)
-            ix = lerp(fx, tx, eased_t)
-            iy = lerp(fy, ty, eased_t)
+        anim_pos = self.anim_rect()
+        if anim_pos and anim_pos.colliderect(rect):
             img = self.pieces.get((PIECE_ORDER[self.anim_piece.piece_type], self.anim_piece.color))
             if img:
-                self.screen.blit(img, (int(ix), int(iy)))
+                self.screen.blit(img, anim_pos)
     def draw_message(self):
         if self.msg:
             surf = self.large_font.render(self.msg, True, ACCENT)
@@ -287,6 +345,39 @@ class Game:
             mouse_pos = pg.mouse.get_pos()
             self.game_over_button.check_hover(mouse_pos)
             self.game_over_button.draw(self.screen, special_style=True)
+    def square_states(self):
+        # What each square shows; a square is redrawn only when this changes.
+        hidden = self.anim_move.from_square if self.animating else None
+        targets = {move.to_square for move in self.legal_moves}
+        return [(None if sq == hidden else self.board.piece_at(sq), sq == self.selected, sq in targets) for sq in chess.SQUARES]
+    def dirty_rects(self):
+        states = self.square_states()
+        anim = self.anim_rect()
+        overlay = (self.awaiting_promotion, self.show_game_over_popup, self.msg)
+        if self.full_redraw or overlay != self.drawn_overlay:
+            rects = [self.screen.get_rect()]
+        else:
+            rects = [self.square_rect(sq) for sq in chess.SQUARES if states[sq] != self.drawn_states[sq]]
+            if anim != self.drawn_anim:
+                rects.extend(r for r in (self.drawn_anim, anim) if r is not None)
+        self.full_redraw = False
+        self.drawn_states = states
+        self.drawn_anim = anim
+        self.drawn_overlay = overlay
+        return rects
+    def render(self):
+        rects = self.dirty_rects()
+        for rect in rects:
+            self.screen.set_clip(rect)
+            self.draw_board(rect)
+            self.draw_highlights(rect)
+            self.draw_pieces(rect)
+            self.draw_message()
+            self.draw_promotion_ui()
+            self.draw_game_over_popup()
+        self.screen.set_clip(None)
+        if rects:
+            pg.display.update(rects)
     def handle_click(self, pos):
         if self.show_game_over_popup:
             if self.game_over_button.check_click(pos):
@@ -322,24 +413,35 @@ class Game:
             else:
                 self.selected = None
                 self.legal_moves = []
+    def post_ai_result(self, generation, kind, move):
+        # Runs on the worker thread; wakes the idle main loop.
+        pg.event.post(pg.event.Event(AI_RESULT_EVENT, generation=generation, kind=kind))
+    def next_events(self):
+        # Only animation needs a steady frame rate. Otherwise sleep until input
+        # or the AI worker's result arrives; the timeout is just a safety net.
+        if self.animating:
+            self.clock.tick(FPS)
+            return pg.event.get()
+        event = pg.event.wait(IDLE_TIMEOUT_MS)
+        return [event] + pg.event.get()
     def run(self):
+        self.render()
         while self.running:
-            self.clock.tick(60)
-            for event in pg.event.get():
+            for event in self.next_events():
                 if event.type == pg.QUIT:
                     self.running = False
                 elif event.type == pg.MOUSEBUTTONDOWN and event.button == 1:
                     self.handle_click(event.pos)
+                elif event.type == pg.MOUSEMOTION and (self.awaiting_promotion or self.show_game_over_popup):
+                    # Popup buttons change with hover.
+                    self.full_redraw = True
+                elif event.type == pg.VIDEOEXPOSE:
+                    self.full_redraw = True
             self.update_animation()
             if not self.game_over and not self.animating:
                 if self.board.turn == self.ai_color:
                     self.ai_move()
-            self.screen.fill(BG)
-            self.draw_board()
-            self.draw_highlights()
-            self.draw_pieces()
-            self.draw_message()
-            self.draw_promotion_ui()
-            self.draw_game_over_popup()
-            pg.display.flip()
+            self.render()
+        self.worker.shutdown()
+        self.ai.close()
         pg.quit()
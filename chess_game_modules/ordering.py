@@ -0,0 +1,92 @@
+import chess
+
+TT_MOVE_SCORE = 10_000_000
+PV_MOVE_SCORE = 9_000_000
+CAPTURE_SCORE = 1_000_000
+KILLER_SCORES = (900_000, 800_000)
+HISTORY_LIMIT = 500_000
+
+def mvv_lva(board, move):
+    # Most valuable victim first, least valuable attacker as tie-break.
+    if board.is_en_passant(move):
+        victim = chess.PAWN
+    else:
+        victim = board.piece_type_at(move.to_square) or 0
+    attacker = board.piece_type_at(move.from_square)
+    return victim * 8 - attacker + (move.promotion or 0) * 8
+
+def native_mvv_lva(position, move):
+    # The same for a position.Position and its int moves.
+    if position.is_en_passant(move):
+        victim = chess.PAWN
+    else:
+        victim = position.piece_type_at(move >> 6 & 63) or 0
+    return victim * 8 - position.piece_type_at(move & 63) + (move >> 12) * 8
+
+class MoveOrderer:
+    def __init__(self, max_ply=128):
+        self.max_ply = max_ply
+        self.history = [[[0] * 64 for _ in range(64)] for _ in chess.COLORS]
+        self.killers = [[None, None] for _ in range(max_ply)]
+    def new_search(self):
+        # Killers are tied to plies of the old tree; history only fades.
+        self.killers = [[None, None] for _ in range(self.max_ply)]
+        for table in self.history:
+            for row in table:
+                for to_square in range(64):
+                    row[to_square] >>= 1
+    def is_quiet(self, board, move):
+        return not move.promotion and not board.is_capture(move)
+    def score(self, board, move, ply, tt_move=None, pv_move=None):
+        if move == tt_move:
+            return TT_MOVE_SCORE
+        if move == pv_move:
+            return PV_MOVE_SCORE
+        if move.promotion or board.is_capture(move):
+            return CAPTURE_SCORE + mvv_lva(board, move)
+        if ply < self.max_ply:
+            killers = self.killers[ply]
+            if move == killers[0]:
+                return KILLER_SCORES[0]
+            if move == killers[1]:
+                return KILLER_SCORES[1]
+        return self.history[board.turn][move.from_square][move.to_square]
+    def order(self, board, moves, ply, tt_move=None, pv_move=None):
+        return sorted(moves, key=lambda move: self.score(board, move, ply, tt_move, pv_move), reverse=True)
+    def native_score(self, position, move, ply, tt_move=None, pv_move=None):
+        if move == tt_move:
+            return TT_MOVE_SCORE
+        if move == pv_move:
+            return PV_MOVE_SCORE
+        if move >> 12 or position.is_capture(move):
+            return CAPTURE_SCORE + native_mvv_lva(position, move)
+        if ply < self.max_ply:
+            killers = self.killers[ply]
+            if move == killers[0]:
+                return KILLER_SCORES[0]
+            if move == killers[1]:
+                return KILLER_SCORES[1]
+        return self.history[position.turn][move & 63][move >> 6 & 63]
+    def native_order(self, position, moves, ply, tt_move=None, pv_move=None):
+        return sorted(moves, key=lambda move: self.native_score(position, move, ply, tt_move, pv_move), reverse=True)
+    def record_cutoff(self, board, move, ply, depth):
+        if not self.is_quiet(board, move):
+            return
+        if ply < self.max_ply:
+            killers = self.killers[ply]
+            if move != killers[0]:
+                killers[1] = killers[0]
+                killers[0] = move
+        row = self.history[board.turn][move.from_square]
+        row[move.to_square] = min(row[move.to_square] + depth * depth, HISTORY_LIMIT)
+    def native_record_cutoff(self, position, move, ply, depth):
+        if move >> 12 or position.is_capture(move):
+            return
+        if ply < self.max_ply:
+            killers = self.killers[ply]
+            if move != killers[0]:
+                killers[1] = killers[0]
+                killers[0] = move
+        row = self.history[position.turn][move & 63]
+        to_square = move >> 6 & 63
+        row[to_square] = min(row[to_square] + depth * depth, HISTORY_LIMIT)
@@ -0,0 +1,55 @@
+import chess
+from .transposition import PIECE_ZOBRIST
+
+DOUBLED_PAWN_PENALTY = 15
+ISOLATED_PAWN_PENALTY = 20
+
+PAWN_ZOBRIST = {color: PIECE_ZOBRIST[color][chess.PAWN] for color in chess.COLORS}
+
+def pawn_key(board):
+    key = 0
+    for color in chess.COLORS:
+        randoms = PAWN_ZOBRIST[color]
+        for sq in chess.scan_forward(board.pieces_mask(chess.PAWN, color)):
+            key ^= randoms[sq]
+    return key
+
+def file_mask(bb):
+    # Fold all ranks onto the first one: bit n is set when file n holds a pawn.
+    bb |= bb >> 32
+    bb |= bb >> 16
+    bb |= bb >> 8
+    return bb & 0xFF
+
+def pawn_penalty(pawns):
+    files = file_mask(pawns)
+    doubled = chess.popcount(pawns) - chess.popcount(files)
+    isolated = chess.popcount(files & ~((files << 1) | (files >> 1)))
+    return doubled * DOUBLED_PAWN_PENALTY + isolated * ISOLATED_PAWN_PENALTY
+
+def pawn_structure(board):
+    white = board.pieces_mask(chess.PAWN, chess.WHITE)
+    black = board.pieces_mask(chess.PAWN, chess.BLACK)
+    return pawn_penalty(black) - pawn_penalty(white)
+
+class PawnHashTable:
+    def __init__(self, size=1 << 14):
+        self.size = 1 << (max(1, size).bit_length() - 1)
+        self.mask = self.size - 1
+        self.clear()
+    def clear(self):
+        self.entries = [None] * self.size
+        self.hits = 0
+        self.probes = 0
+    def score(self, board, key=None):
+        if key is None:
+            key = pawn_key(board)
+        self.probes += 1
+        index = key & self.mask
+        entry = self.entries[index]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+        score = pawn_structure(board)
+        self.entries[index] = (key, score)
+        return score
@@ -0,0 +1,512 @@
+from array import array
+import chess
+from chess import (
+    BB_SQUARES, BB_ALL, BB_RANK_1, BB_RANK_3, BB_RANK_4, BB_RANK_5, BB_RANK_6, BB_RANK_8, BB_RANKS,
+    BB_FILE_C, BB_FILE_D, BB_FILE_F, BB_FILE_G, BB_LIGHT_SQUARES, BB_DARK_SQUARES, BB_RAYS,
+    BB_KNIGHT_ATTACKS, BB_KING_ATTACKS, BB_PAWN_ATTACKS,
+    BB_DIAG_MASKS, BB_DIAG_ATTACKS, BB_FILE_MASKS, BB_FILE_ATTACKS, BB_RANK_MASKS, BB_RANK_ATTACKS,
+)
+from chess.polyglot import POLYGLOT_RANDOM_ARRAY
+from .transposition import PIECE_ZOBRIST
+
+# A board for the search only. Pieces live in twelve bitboards, indexed
+# piece_type - 1 for White and piece_type + 5 for Black, with a mailbox of the
+# same indexes beside them. Moves are plain ints (from | to << 6 | promotion << 12)
+# held in arrays. Castling, en passant and the key are the same as python-chess
+# and Polyglot, so tables filled by either representation agree.
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PROMOTIONS = (chess.QUEEN << 12, chess.ROOK << 12, chess.BISHOP << 12, chess.KNIGHT << 12)
+
+popcount = chess.popcount
+
+BETWEEN = [[chess.between(a, b) for b in chess.SQUARES] for a in chess.SQUARES]
+
+# Zobrist keys per piece index, plus the non-piece part of the Polyglot key.
+ZOBRIST = [PIECE_ZOBRIST[color][piece_type] for color in (chess.WHITE, chess.BLACK) for piece_type in chess.PIECE_TYPES]
+CASTLING_KEYS = {}
+for _mask in range(16):
+    _rights = 0
+    _key = 0
+    for _bit, (_square, _index) in enumerate([(chess.H1, 768), (chess.A1, 769), (chess.H8, 770), (chess.A8, 771)]):
+        if _mask >> _bit & 1:
+            _rights |= BB_SQUARES[_square]
+            _key ^= POLYGLOT_RANDOM_ARRAY[_index]
+    CASTLING_KEYS[_rights] = _key
+EP_KEYS = [POLYGLOT_RANDOM_ARRAY[772 + chess.square_file(sq)] for sq in chess.SQUARES]
+TURN_KEY = POLYGLOT_RANDOM_ARRAY[780]
+
+# Squares a pawn has to stand on to take en passant on each square; Polyglot
+# only hashes the en passant file when one of them holds a pawn.
+EP_CAPTURERS = [
+    chess.shift_left(BB_SQUARES[sq + 8]) | chess.shift_right(BB_SQUARES[sq + 8]) if chess.square_rank(sq) == 2 else
+    chess.shift_left(BB_SQUARES[sq - 8]) | chess.shift_right(BB_SQUARES[sq - 8]) if chess.square_rank(sq) == 5 else 0
+    for sq in chess.SQUARES
+]
+
+# Rook from and to squares by the king's castling destination.
+CASTLING_ROOKS = {chess.G1: (chess.H1, chess.F1), chess.C1: (chess.A1, chess.D1), chess.G8: (chess.H8, chess.F8), chess.C8: (chess.A8, chess.D8)}
+
+def encode_move(move):
+    return move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
+def decode_move(move):
+    return chess.Move(move & 63, move >> 6 & 63, move >> 12 or None)
+
+class Position:
+    def __init__(self, board, piece_scores):
+        # piece_scores[color][piece_type][square] is the incremental material score (ai.PST_SCORES).
+        self.scores = [piece_scores[color][piece_type] for color in (chess.WHITE, chess.BLACK) for piece_type in chess.PIECE_TYPES]
+        self.pieces = [0] * 12
+        self.squares = [None] * 64
+        self.score = 0
+        self.board_key = 0
+        self.pawn_key = 0
+        for square, piece in board.piece_map().items():
+            index = piece.piece_type - 1 + (0 if piece.color else 6)
+            self.pieces[index] |= BB_SQUARES[square]
+            self.squares[square] = index
+            self.score += self.scores[index][square]
+            self.board_key ^= ZOBRIST[index][square]
+            if piece.piece_type == chess.PAWN:
+                self.pawn_key ^= ZOBRIST[index][square]
+        self.occupied_co = [board.occupied_co[chess.BLACK], board.occupied_co[chess.WHITE]]
+        self.occupied = board.occupied
+        self.turn = board.turn
+        self.castling = board.clean_castling_rights()
+        self.ep_square = board.ep_square
+        self.halfmove_clock = board.halfmove_clock
+        self.key = self.state_key()
+        self.stack = []
+        self.move_stack = []
+        # Keys of the positions since the last capture or pawn move, for repetitions.
+        self.keys = []
+        history = board.copy()
+        while history.move_stack and len(self.keys) < board.halfmove_clock:
+            history.pop()
+            self.keys.append(chess.polyglot.zobrist_hash(history))
+        self.keys.reverse()
+    def state_key(self):
+        key = self.board_key ^ CASTLING_KEYS[self.castling]
+        if self.ep_square is not None and EP_CAPTURERS[self.ep_square] & self.pieces[PAWN if self.turn else PAWN + 6]:
+            key ^= EP_KEYS[self.ep_square]
+        return key ^ TURN_KEY if self.turn else key
+
+    # The parts of the chess.Board interface the evaluation, pawn table and bitbases read.
+    @property
+    def pawns(self):
+        return self.pieces[PAWN] | self.pieces[PAWN + 6]
+    @property
+    def kings(self):
+        return self.pieces[KING] | self.pieces[KING + 6]
+    def pieces_mask(self, piece_type, color):
+        return self.pieces[piece_type - 1 if color else piece_type + 5]
+    def piece_type_at(self, square):
+        index = self.squares[square]
+        return None if index is None else index % 6 + 1
+    def color_at(self, square):
+        index = self.squares[square]
+        return None if index is None else index < 6
+    def king(self, color):
+        bb = self.pieces[KING if color else KING + 6]
+        return bb.bit_length() - 1 if bb else None
+    def attackers_mask(self, color, square, occupied=None):
+        if occupied is None:
+            occupied = self.occupied
+        pieces = self.pieces
+        offset = 0 if color else 6
+        queens = pieces[offset + QUEEN]
+        rooks = pieces[offset + ROOK] | queens
+        bishops = pieces[offset + BISHOP] | queens
+        return ((BB_KING_ATTACKS[square] & pieces[offset + KING]) |
+                (BB_KNIGHT_ATTACKS[square] & pieces[offset + KNIGHT]) |
+                (BB_RANK_ATTACKS[square][BB_RANK_MASKS[square] & occupied] & rooks) |
+                (BB_FILE_ATTACKS[square][BB_FILE_MASKS[square] & occupied] & rooks) |
+                (BB_DIAG_ATTACKS[square][BB_DIAG_MASKS[square] & occupied] & bishops) |
+                (BB_PAWN_ATTACKS[not color][square] & pieces[offset + PAWN]))
+    def is_check(self):
+        king = self.pieces[KING if self.turn else KING + 6]
+        return bool(king) and bool(self.attackers_mask(not self.turn, king.bit_length() - 1))
+    def is_checkmate(self):
+        return self.is_check() and not self.legal_moves()
+    def is_en_passant(self, move):
+        from_square, to_square = move & 63, move >> 6 & 63
+        return (to_square == self.ep_square and self.squares[from_square] in (PAWN, PAWN + 6)
+                and abs(to_square - from_square) in (7, 9) and self.squares[to_square] is None)
+    def is_capture(self, move):
+        return bool(BB_SQUARES[move >> 6 & 63] & self.occupied_co[not self.turn]) or self.is_en_passant(move)
+    def gives_check(self, move):
+        self.push(move)
+        check = self.is_check()
+        self.pop()
+        return check
+    def has_insufficient_material(self, color):
+        pieces = self.pieces
+        ours = self.occupied_co[color]
+        if ours & (self.pawns | pieces[ROOK] | pieces[ROOK + 6] | pieces[QUEEN] | pieces[QUEEN + 6]):
+            return False
+        knights = pieces[KNIGHT] | pieces[KNIGHT + 6]
+        if ours & knights:
+            return popcount(ours) <= 2 and not (self.occupied_co[not color] & ~self.kings & ~(pieces[QUEEN] | pieces[QUEEN + 6]))
+        bishops = pieces[BISHOP] | pieces[BISHOP + 6]
+        if ours & bishops:
+            same_color = not bishops & BB_DARK_SQUARES or not bishops & BB_LIGHT_SQUARES
+            return same_color and not self.pawns and not knights
+        return True
+    def is_insufficient_material(self):
+        return self.has_insufficient_material(chess.WHITE) and self.has_insufficient_material(chess.BLACK)
+    def is_repetition(self, count=3):
+        # Only positions since the last irreversible move can repeat, and only
+        # with the same side to move.
+        keys = self.keys
+        key = self.key
+        repeats = 1
+        for index in range(len(keys) - 2, max(len(keys) - self.halfmove_clock, 0) - 1, -2):
+            if keys[index] == key:
+                repeats += 1
+                if repeats >= count:
+                    return True
+        return False
+
+    # Legal moves in the same order as python-chess generates them, so that
+    # a stable sort by the same scores gives the same search tree.
+    def legal_moves(self, from_mask=BB_ALL, to_mask=BB_ALL):
+        moves = array("H")
+        turn = self.turn
+        king = self.pieces[KING if turn else KING + 6].bit_length() - 1
+        checkers = self.attackers_mask(not turn, king)
+        if checkers:
+            self.evasions(moves, king, checkers, from_mask, to_mask)
+        else:
+            self.pseudo_legal(moves, king, self.slider_blockers(king), from_mask, to_mask)
+        self.en_passant(moves, from_mask, to_mask)
+        return moves
+    def legal_captures(self):
+        moves = self.legal_moves(BB_ALL, self.occupied_co[not self.turn])
+        self.en_passant(moves, BB_ALL, BB_ALL)
+        return moves
+    def slider_blockers(self, king):
+        # Our pieces that are the only thing between the king and an enemy slider.
+        pieces = self.pieces
+        offset = 6 if self.turn else 0
+        queens = pieces[offset + QUEEN]
+        snipers = (((BB_RANK_ATTACKS[king][0] | BB_FILE_ATTACKS[king][0]) & (pieces[offset + ROOK] | queens)) |
+                   (BB_DIAG_ATTACKS[king][0] & (pieces[offset + BISHOP] | queens)))
+        blockers = 0
+        occupied = self.occupied
+        while snipers:
+            sniper = snipers.bit_length() - 1
+            snipers ^= BB_SQUARES[sniper]
+            b = BETWEEN[king][sniper] & occupied
+            if b and BB_SQUARES[b.bit_length() - 1] == b:
+                blockers |= b
+        return blockers & self.occupied_co[self.turn]
+    def evasions(self, moves, king, checkers, from_mask, to_mask):
+        turn = self.turn
+        pieces = self.pieces
+        offset = 6 if turn else 0
+        sliders = checkers & (pieces[offset + BISHOP] | pieces[offset + ROOK] | pieces[offset + QUEEN])
+        attacked = 0
+        while sliders:
+            checker = sliders.bit_length() - 1
+            sliders ^= BB_SQUARES[checker]
+            attacked |= BB_RAYS[king][checker] & ~BB_SQUARES[checker]
+        if BB_SQUARES[king] & from_mask:
+            targets = BB_KING_ATTACKS[king] & ~self.occupied_co[turn] & ~attacked & to_mask
+            while targets:
+                to_square = targets.bit_length() - 1
+                targets ^= BB_SQUARES[to_square]
+                if not self.attackers_mask(not turn, to_square):
+                    moves.append(king | to_square << 6)
+        checker = checkers.bit_length() - 1
+        if BB_SQUARES[checker] == checkers:
+            # Capture or block a single checker.
+            target = BETWEEN[king][checker] | checkers
+            self.pseudo_legal(moves, king, self.slider_blockers(king), from_mask & ~self.kings, target & to_mask)
+    def pseudo_legal(self, moves, king, blockers, from_mask, to_mask):
+        # Pseudo-legal moves except en passant, dropping those that leave the king in check.
+        append = moves.append
+        turn = self.turn
+        pieces = self.pieces
+        squares = self.squares
+        occupied = self.occupied
+        ours = self.occupied_co[turn]
+        offset = 0 if turn else 6
+        # Pieces, from the highest square down.
+        non_pawns = ours & ~pieces[offset + PAWN] & from_mask
+        allowed = ~ours & to_mask
+        while non_pawns:
+            from_square = non_pawns.bit_length() - 1
+            from_bb = BB_SQUARES[from_square]
+            non_pawns ^= from_bb
+            piece = squares[from_square] - offset
+            if piece == KNIGHT:
+                targets = BB_KNIGHT_ATTACKS[from_square]
+            elif piece == BISHOP:
+                targets = BB_DIAG_ATTACKS[from_square][BB_DIAG_MASKS[from_square] & occupied]
+            elif piece == ROOK:
+                targets = (BB_RANK_ATTACKS[from_square][BB_RANK_MASKS[from_square] & occupied] |
+                           BB_FILE_ATTACKS[from_square][BB_FILE_MASKS[from_square] & occupied])
+            elif piece == QUEEN:
+                targets = (BB_DIAG_ATTACKS[from_square][BB_DIAG_MASKS[from_square] & occupied] |
+                           BB_RANK_ATTACKS[from_square][BB_RANK_MASKS[from_square] & occupied] |
+                           BB_FILE_ATTACKS[from_square][BB_FILE_MASKS[from_square] & occupied])
+            else:
+                targets = BB_KING_ATTACKS[from_square]
+            targets &= allowed
+            if from_square == king:
+                while targets:
+                    to_square = targets.bit_length() - 1
+                    targets ^= BB_SQUARES[to_square]
+                    if not self.attackers_mask(not turn, to_square):
+                        append(from_square | to_square << 6)
+                continue
+            if from_bb & blockers:
+                # Pinned: only along the line through the king.
+                targets &= BB_RAYS[king][from_square]
+            while targets:
+                to_square = targets.bit_length() - 1
+                targets ^= BB_SQUARES[to_square]
+                append(from_square | to_square << 6)
+        if from_mask & self.kings:
+            self.castling_moves(moves, from_mask, to_mask)
+        pawns = pieces[offset + PAWN] & from_mask
+        if not pawns:
+            return
+        # Pawn captures.
+        attacks = BB_PAWN_ATTACKS[turn]
+        enemy = self.occupied_co[not turn] & to_mask
+        capturers = pawns
+        while capturers:
+            from_square = capturers.bit_length() - 1
+            capturers ^= BB_SQUARES[from_square]
+            targets = attacks[from_square] & enemy
+            if targets and BB_SQUARES[from_square] & blockers:
+                targets &= BB_RAYS[king][from_square]
+            while targets:
+                to_square = targets.bit_length() - 1
+                targets ^= BB_SQUARES[to_square]
+                move = from_square | to_square << 6
+                if to_square < 8 or to_square >= 56:
+                    for promotion in PROMOTIONS:
+                        append(move | promotion)
+                else:
+                    append(move)
+        # Pawn advances, single then double.
+        if turn:
+            single_moves = pawns << 8 & ~occupied
+            double_moves = single_moves << 8 & ~occupied & (BB_RANK_3 | BB_RANK_4)
+            step = -8
+        else:
+            single_moves = pawns >> 8 & ~occupied
+            double_moves = single_moves >> 8 & ~occupied & (BB_RANK_6 | BB_RANK_5)
+            step = 8
+        single_moves &= to_mask
+        double_moves &= to_mask
+        while single_moves:
+            to_square = single_moves.bit_length() - 1
+            single_moves ^= BB_SQUARES[to_square]
+            from_square = to_square + step
+            if BB_SQUARES[from_square] & blockers and not BB_RAYS[king][from_square] & BB_SQUARES[to_square]:
+                continue
+            move = from_square | to_square << 6
+            if to_square < 8 or to_square >= 56:
+                for promotion in PROMOTIONS:
+                    append(move | promotion)
+            else:
+                append(move)
+        while double_moves:
+            to_square = double_moves.bit_length() - 1
+            double_moves ^= BB_SQUARES[to_square]
+            from_square = to_square + 2 * step
+            if BB_SQUARES[from_square] & blockers and not BB_RAYS[king][from_square] & BB_SQUARES[to_square]:
+                continue
+            append(from_square | to_square << 6)
+    def castling_moves(self, moves, from_mask, to_mask):
+        turn = self.turn
+        backrank = BB_RANK_1 if turn else BB_RANK_8
+        king = self.pieces[KING if turn else KING + 6] & backrank & from_mask
+        king &= -king
+        if not king:
+            return
+        king_square = king.bit_length() - 1
+        occupied = self.occupied
+        candidates = self.castling & backrank & to_mask
+        while candidates:
+            candidate = candidates.bit_length() - 1
+            rook = BB_SQUARES[candidate]
+            candidates ^= rook
+            a_side = rook < king
+            king_to = (BB_FILE_C if a_side else BB_FILE_G) & backrank
+            rook_to = (BB_FILE_D if a_side else BB_FILE_F) & backrank
+            king_path = BETWEEN[king_square][king_to.bit_length() - 1]
+            rook_path = BETWEEN[candidate][rook_to.bit_length() - 1]
+            if (occupied ^ king ^ rook) & (king_path | rook_path | king_to | rook_to):
+                continue
+            if self.attacked_for_king(king_path | king, occupied ^ king):
+                continue
+            if self.attacked_for_king(king_to, occupied ^ king ^ rook ^ rook_to):
+                continue
+            moves.append(king_square | (king_to.bit_length() - 1) << 6)
+    def attacked_for_king(self, path, occupied):
+        enemy = not self.turn
+        while path:
+            square = path.bit_length() - 1
+            path ^= BB_SQUARES[square]
+            if self.attackers_mask(enemy, square, occupied):
+                return True
+        return False
+    def en_passant(self, moves, from_mask, to_mask):
+        # Rare enough to check by playing the capture and looking at the king.
+        ep_square = self.ep_square
+        if ep_square is None or not BB_SQUARES[ep_square] & to_mask or BB_SQUARES[ep_square] & self.occupied:
+            return
+        turn = self.turn
+        capturers = (self.pieces[PAWN if turn else PAWN + 6] & from_mask &
+                     BB_PAWN_ATTACKS[not turn][ep_square] & BB_RANKS[4 if turn else 3])
+        while capturers:
+            from_square = capturers.bit_length() - 1
+            capturers ^= BB_SQUARES[from_square]
+            move = from_square | ep_square << 6
+            self.push(move)
+            king = self.pieces[KING if turn else KING + 6].bit_length() - 1
+            legal = not self.attackers_mask(not turn, king)
+            self.pop()
+            if legal:
+                moves.append(move)
+
+    def push(self, move):
+        from_square = move & 63
+        to_square = move >> 6 & 63
+        pieces = self.pieces
+        squares = self.squares
+        occupied_co = self.occupied_co
+        scores = self.scores
+        turn = self.turn
+        piece = squares[from_square]
+        captured = squares[to_square]
+        capture_square = to_square
+        ep_square = self.ep_square
+        castling = self.castling
+        halfmove_clock = self.halfmove_clock
+        score = self.score
+        board_key = self.board_key
+        pawn_key = self.pawn_key
+        self.keys.append(self.key)
+        self.move_stack.append(move)
+        self.ep_square = None
+        self.halfmove_clock += 1
+        from_bb = BB_SQUARES[from_square]
+        to_bb = BB_SQUARES[to_square]
+        offset = 0 if turn else 6
+        pieces[piece] ^= from_bb
+        occupied_co[turn] ^= from_bb
+        squares[from_square] = None
+        score -= scores[piece][from_square]
+        board_key ^= ZOBRIST[piece][from_square]
+        if captured is not None:
+            pieces[captured] ^= to_bb
+            occupied_co[not turn] ^= to_bb
+            score -= scores[captured][to_square]
+            board_key ^= ZOBRIST[captured][to_square]
+            if captured % 6 == PAWN:
+                pawn_key ^= ZOBRIST[captured][to_square]
+            self.halfmove_clock = 0
+        self.castling = castling & ~(from_bb | to_bb)
+        placed = piece
+        if piece == offset + PAWN:
+            self.halfmove_clock = 0
+            pawn_key ^= ZOBRIST[piece][from_square]
+            diff = to_square - from_square
+            if diff == 16 or diff == -16:
+                self.ep_square = from_square + diff // 2
+            elif to_square == ep_square and captured is None and diff != 8 and diff != -8:
+                capture_square = to_square - 8 if turn else to_square + 8
+                captured = squares[capture_square]
+                capture_bb = BB_SQUARES[capture_square]
+                pieces[captured] ^= capture_bb
+                occupied_co[not turn] ^= capture_bb
+                squares[capture_square] = None
+                score -= scores[captured][capture_square]
+                board_key ^= ZOBRIST[captured][capture_square]
+                pawn_key ^= ZOBRIST[captured][capture_square]
+            if move >> 12:
+                placed = (move >> 12) - 1 + offset
+            else:
+                pawn_key ^= ZOBRIST[piece][to_square]
+        elif piece == offset + KING:
+            self.castling &= ~(BB_RANK_1 if turn else BB_RANK_8)
+            if to_square - from_square in (2, -2):
+                rook_from, rook_to = CASTLING_ROOKS[to_square]
+                rook = offset + ROOK
+                rook_bb = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+                pieces[rook] ^= rook_bb
+                occupied_co[turn] ^= rook_bb
+                squares[rook_from] = None
+                squares[rook_to] = rook
+                score += scores[rook][rook_to] - scores[rook][rook_from]
+                board_key ^= ZOBRIST[rook][rook_from] ^ ZOBRIST[rook][rook_to]
+        pieces[placed] |= to_bb
+        occupied_co[turn] |= to_bb
+        squares[to_square] = placed
+        score += scores[placed][to_square]
+        board_key ^= ZOBRIST[placed][to_square]
+        self.stack.append((piece, captured, capture_square, castling, ep_square, halfmove_clock, self.score, self.board_key, self.pawn_key))
+        self.score = score
+        self.board_key = board_key
+        self.pawn_key = pawn_key
+        self.occupied = occupied_co[0] | occupied_co[1]
+        self.turn = not turn
+        self.key = self.state_key()
+    def push_null(self):
+        self.keys.append(self.key)
+        self.move_stack.append(None)
+        self.stack.append((None, None, None, self.castling, self.ep_square, self.halfmove_clock, self.score, self.board_key, self.pawn_key))
+        self.ep_square = None
+        self.halfmove_clock += 1
+        self.turn = not self.turn
+        self.key = self.state_key()
+    def pop(self):
+        move = self.move_stack.pop()
+        piece, captured, capture_square, self.castling, self.ep_square, self.halfmove_clock, self.score, self.board_key, self.pawn_key = self.stack.pop()
+        self.key = self.keys.pop()
+        turn = self.turn = not self.turn
+        if move is None:
+            return
+        from_square = move & 63
+        to_square = move >> 6 & 63
+        pieces = self.pieces
+        squares = self.squares
+        occupied_co = self.occupied_co
+        from_bb = BB_SQUARES[from_square]
+        to_bb = BB_SQUARES[to_square]
+        pieces[squares[to_square]] ^= to_bb
+        pieces[piece] |= from_bb
+        occupied_co[turn] ^= from_bb | to_bb
+        squares[to_square] = None
+        squares[from_square] = piece
+        if captured is not None:
+            capture_bb = BB_SQUARES[capture_square]
+            pieces[captured] |= capture_bb
+            occupied_co[not turn] |= capture_bb
+            squares[capture_square] = captured
+        elif piece % 6 == KING and to_square - from_square in (2, -2):
+            rook_from, rook_to = CASTLING_ROOKS[to_square]
+            rook = squares[rook_to]
+            rook_bb = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+            pieces[rook] ^= rook_bb
+            occupied_co[turn] ^= rook_bb
+            squares[rook_to] = None
+            squares[rook_from] = rook
+        self.occupied = occupied_co[0] | occupied_co[1]
+
+def perft(position, depth):
+    moves = position.legal_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        position.push(move)
+        nodes += perft(position, depth - 1)
+        position.pop()
+    return nodes
@@ -0,0 +1,190 @@
+import argparse
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+import chess
+from .ai import AI
+from .book import BOOK_PATH
+
+DEFAULT_OPENINGS = [
+    chess.STARTING_FEN,
+    "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",
+    "rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",
+    "rnbqkbnr/ppp1pppp/8/3p4/3P4/8/PPP1PPPP/RNBQKBNR w KQkq - 0 2",
+    "rnbqkb1r/pppppppp/5n2/8/3P4/8/PPP1PPPP/RNBQKBNR w KQkq - 1 2",
+    "rnbqkbnr/pppp1ppp/4p3/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",
+    "rnbqkbnr/pp1ppppp/2p5/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",
+    "rnbqkbnr/pppppppp/8/8/2P5/8/PP1PPPPP/RNBQKBNR b KQkq - 0 1",
+]
+
+def parse_config(text):
+    # "Hard" or "Medium,time=0.5,depth=3" -> keyword arguments for make_ai.
+    name, *options = text.split(",")
+    config = {"difficulty": name.strip()}
+    for option in options:
+        key, _, value = option.partition("=")
+        key = key.strip()
+        if key == "time":
+            config["think_time"] = float(value)
+        elif key == "depth":
+            config["max_depth"] = int(value)
+        elif key == "randomness":
+            config["randomness"] = float(value)
+        elif key in ("nullmove", "lmr", "native"):
+            config["null_move" if key == "nullmove" else key] = value.strip() not in ("0", "off", "false")
+        else:
+            raise ValueError(f"unknown option {key!r} in {text!r}")
+    # Without a deadline the search only stops at depth, and the default cap is MAX_DEPTH.
+    if config.get("think_time") == 0 and "max_depth" not in config:
+        raise ValueError(f"time=0 needs depth= as well in {text!r}")
+    return config
+
+def make_ai(config, seed, use_book):
+    ai = AI(config["difficulty"], seed=seed, book_path=BOOK_PATH if use_book else None)
+    if "think_time" in config:
+        ai.think_time = config["think_time"]
+    if "max_depth" in config:
+        ai.max_depth = config["max_depth"]
+    if "randomness" in config:
+        ai.randomness = config["randomness"]
+    if "null_move" in config:
+        ai.null_move = config["null_move"]
+    if "lmr" in config:
+        ai.lmr = config["lmr"]
+    if "native" in config:
+        ai.native = config["native"]
+    return ai
+
+def load_openings(path):
+    openings = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            board = chess.Board()
+            fields = line.split()
+            if len(fields) >= 6 and fields[4].isdigit():
+                board.set_fen(" ".join(fields[:6]))
+            else:
+                board.set_epd(line)
+            openings.append(board.fen())
+    return openings
+
+def play_game(job):
+    index, fen, config_a, config_b, a_is_white, seed, max_plies, use_book = job
+    ai_a = make_ai(config_a, seed * 2, use_book)
+    ai_b = make_ai(config_b, seed * 2 + 1, use_book)
+    players = {chess.WHITE: ai_a if a_is_white else ai_b, chess.BLACK: ai_b if a_is_white else ai_a}
+    totals = {id(ai_a): [0, 0.0, 0, 0], id(ai_b): [0, 0.0, 0, 0]}
+    board = chess.Board(fen)
+    while not board.is_game_over(claim_draw=True) and len(board.move_stack) < max_plies:
+        ai = players[board.turn]
+        start = time.time()
+        move = ai.choose_move(board)
+        elapsed = time.time() - start
+        if ai.last_stats is not None:
+            nodes, seconds, depths, searches = totals[id(ai)]
+            totals[id(ai)] = [nodes + ai.last_stats.total_nodes(), seconds + elapsed, depths + ai.last_depth, searches + 1]
+        board.push(move)
+    result = board.result(claim_draw=True)
+    if result == "*":
+        result = "1/2-1/2"
+    white_score = {"1-0": 1.0, "0-1": 0.0}.get(result, 0.5)
+    score_a = white_score if a_is_white else 1.0 - white_score
+    ai_a.close()
+    ai_b.close()
+    return index, score_a, totals[id(ai_a)], totals[id(ai_b)], len(board.move_stack)
+
+def elo_from_score(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+def elo_estimate(wins, draws, losses):
+    # Elo difference and 95% interval from the per-game score variance.
+    games = wins + draws + losses
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+    return elo_from_score(score), elo_from_score(score - margin), elo_from_score(score + margin)
+
+def run_match(config_a, config_b, games, openings, workers=1, seed=0, max_plies=300, use_book=False, progress=None):
+    jobs = []
+    for index in range(games):
+        # Each opening is played twice with colours reversed.
+        fen = openings[(index // 2) % len(openings)]
+        jobs.append((index, fen, config_a, config_b, index % 2 == 0, seed * 1_000_003 + index, max_plies, use_book))
+    results = []
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            for result in executor.map(play_game, jobs):
+                results.append(result)
+                if progress:
+                    progress(result)
+    else:
+        for job in jobs:
+            result = play_game(job)
+            results.append(result)
+            if progress:
+                progress(result)
+    return summarize(results)
+
+def side_summary(totals):
+    nodes = sum(t[0] for t in totals)
+    seconds = sum(t[1] for t in totals)
+    depths = sum(t[2] for t in totals)
+    searches = sum(t[3] for t in totals)
+    return {
+        "nps": nodes / seconds if seconds else 0.0,
+        "avg_depth": depths / searches if searches else 0.0,
+        "searches": searches,
+    }
+
+def summarize(results):
+    wins = sum(1 for r in results if r[1] == 1.0)
+    losses = sum(1 for r in results if r[1] == 0.0)
+    draws = len(results) - wins - losses
+    elo, low, high = elo_estimate(wins, draws, losses)
+    return {
+        "games": len(results),
+        "wins": wins,
+        "draws": draws,
+        "losses": losses,
+        "elo": elo,
+        "elo_low": low,
+        "elo_high": high,
+        "a": side_summary([r[2] for r in results]),
+        "b": side_summary([r[3] for r in results]),
+        "avg_plies": sum(r[4] for r in results) / len(results),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play two AI configurations against each other and estimate the Elo difference.")
+    parser.add_argument("a", help='first configuration, e.g. "Hard" or "Hard,time=0.5,depth=4" (time=0 with depth= searches to that depth only, which is reproducible; nullmove=0 and lmr=0 switch off selective search, native=0 searches the python-chess board)')
+    parser.add_argument("b", help="second configuration, same format")
+    parser.add_argument("-n", "--games", type=int, default=20)
+    parser.add_argument("-j", "--workers", type=int, default=1, help="parallel game processes")
+    parser.add_argument("--openings", help="FEN/EPD file of start positions (default: built-in set)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-plies", type=int, default=300, help="adjudicate as a draw after this many plies")
+    parser.add_argument("--book", action="store_true", help="let both sides use the opening book")
+    args = parser.parse_args(argv)
+    if args.games < 1:
+        parser.error("--games must be at least 1")
+    try:
+        config_a, config_b = parse_config(args.a), parse_config(args.b)
+    except ValueError as error:
+        parser.error(str(error))
+    openings = load_openings(args.openings) if args.openings else DEFAULT_OPENINGS
+    def progress(result):
+        index, score, _, _, plies = result
+        print(f"game {index + 1}: {'win' if score == 1 else 'loss' if score == 0 else 'draw'} for A in {plies} plies", flush=True)
+    summary = run_match(config_a, config_b, args.games, openings, args.workers, args.seed, args.max_plies, args.book, progress)
+    print(f"A vs B: +{summary['wins']} ={summary['draws']} -{summary['losses']} over {summary['games']} games")
+    print(f"Elo difference: {summary['elo']:+.1f} (95% CI {summary['elo_low']:+.1f} .. {summary['elo_high']:+.1f})")
+    for side in ("a", "b"):
+        stats = summary[side]
+        print(f"{side.upper()}: {stats['nps']:.0f} nodes/s, average depth {stats['avg_depth']:.2f} over {stats['searches']} searches")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+from collections import namedtuple
+import chess.polyglot
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+TTEntry = namedtuple("TTEntry", ["key", "depth", "score", "flag", "move"])
+
+HASHER = chess.polyglot.ZobristHasher(chess.polyglot.POLYGLOT_RANDOM_ARRAY)
+
+# Polyglot random for each (colour, piece type, square), for keys kept up to date move by move.
+PIECE_ZOBRIST = {
+    color: {
+        piece_type: [chess.polyglot.POLYGLOT_RANDOM_ARRAY[64 * ((piece_type - 1) * 2 + int(color)) + sq] for sq in chess.SQUARES]
+        for piece_type in chess.PIECE_TYPES
+    }
+    for color in chess.COLORS
+}
+
+def position_key(board):
+    return chess.polyglot.zobrist_hash(board)
+
+def piece_key(board):
+    return HASHER.hash_board(board)
+
+def state_key(board):
+    # The non-piece part of the key: castling rights, en passant file and side to move.
+    return HASHER.hash_castling(board) ^ HASHER.hash_ep_square(board) ^ HASHER.hash_turn(board)
+
+class TranspositionTable:
+    def __init__(self, size=1 << 18):
+        # Round down to a power of two so the slot index is a cheap mask.
+        self.size = 1 << (max(1, size).bit_length() - 1)
+        self.mask = self.size - 1
+        self.clear()
+    def clear(self):
+        self.entries = [None] * self.size
+        self.hits = 0
+        self.probes = 0
+    def probe(self, key):
+        self.probes += 1
+        entry = self.entries[key & self.mask]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        return None
+    def store(self, key, depth, score, flag, move):
+        index = key & self.mask
+        old = self.entries[index]
+        if old is not None and old.key == key:
+            # Keep a deeper result for the same position, but never lose its move.
+            if depth < old.depth:
+                return
+            if move is None:
+                move = old.move
+        self.entries[index] = TTEntry(key, depth, score, flag, move)
+    def best_move(self, key):
+        entry = self.probe(key)
+        return entry.move if entry else None
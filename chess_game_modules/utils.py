@@ -2,30 +2,71 @@ import pygame as pg
 import os
 import chess
 
-def load_piece_images(square_size):
-    pieces = {}
-    base_dir = "img"
-    piece_letter = {
-        chess.PAWN: 'p',
-        chess.KNIGHT: 'n',
-        chess.BISHOP: 'b',
-        chess.ROOK: 'r',
-        chess.QUEEN: 'q',
-        chess.KING: 'k',
+BASE_DIR = "img"
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+PIECE_LETTERS = ['p', 'n', 'b', 'r', 'q', 'k']
+COLORS = [(chess.WHITE, "l"), (chess.BLACK, "d")]
+
+# One atlas per square size for the whole process, so a new Game (after
+# "Home") or a size change it has seen before costs nothing.
+_atlases = {}
+
+def piece_path(letter, cstr):
+    return os.path.join(BASE_DIR, f"Chess_{letter}{cstr}t60.png")
+
+def atlas_slots(square_size):
+    # Six pieces across, light on the top row and dark below.
+    return {
+        (letter, color): pg.Rect(col * square_size, row * square_size, square_size, square_size)
+        for row, (color, _) in enumerate(COLORS)
+        for col, letter in enumerate(PIECE_LETTERS)
     }
-    for color, cstr in [(chess.WHITE, "l"), (chess.BLACK, "d")]:
-        prefix = "Chess_"
-        for pt in piece_letter:
-            p = piece_letter[pt]
-            filename = f"{prefix}{p}{cstr}t60.png"
-            path = os.path.join(base_dir, filename)
+
+def build_atlas(square_size):
+    atlas = pg.Surface((6 * square_size, 2 * square_size), pg.SRCALPHA)
+    missing = set()
+    slots = atlas_slots(square_size)
+    for color, cstr in COLORS:
+        for letter in PIECE_LETTERS:
+            path = piece_path(letter, cstr)
             if os.path.exists(path):
                 img = pg.image.load(path).convert_alpha()
                 img = pg.transform.smoothscale(img, (square_size, square_size))
-                pieces[(p, color)] = img
+                atlas.blit(img, slots[(letter, color)])
             else:
-                print(f"Warning: Missing image file {filename}")
-    return pieces
+                print(f"Warning: Missing image file {os.path.basename(path)}")
+                missing.add((letter, color))
+    return atlas, missing
+
+def load_cached_atlas(path):
+    # The pre-scaled atlas on disk, unless a source image is newer than it.
+    if not os.path.exists(path):
+        return None
+    sources = [piece_path(letter, cstr) for letter in PIECE_LETTERS for _, cstr in COLORS]
+    if any(os.path.exists(src) and os.path.getmtime(src) > os.path.getmtime(path) for src in sources):
+        return None
+    try:
+        return pg.image.load(path).convert_alpha()
+    except pg.error:
+        return None
+
+def load_piece_images(square_size, disk_cache=True):
+    if square_size not in _atlases:
+        path = os.path.join(CACHE_DIR, f"pieces_{square_size}.png")
+        atlas = load_cached_atlas(path) if disk_cache else None
+        missing = set()
+        if atlas is None:
+            atlas, missing = build_atlas(square_size)
+            if disk_cache and not missing:
+                try:
+                    os.makedirs(CACHE_DIR, exist_ok=True)
+                    pg.image.save(atlas, path)
+                except (OSError, pg.error):
+                    pass
+        _atlases[square_size] = {
+            key: atlas.subsurface(rect) for key, rect in atlas_slots(square_size).items() if key not in missing
+        }
+    return dict(_atlases[square_size])
 
 def lerp(a, b, t):
     return a + (b - a) * t
@@ -0,0 +1,76 @@
+import queue
+import threading
+
+class AIWorker:
+    # One long-lived search thread per game. Every job gets a generation
+    # number and submitting or cancelling moves it on, so a search that was
+    # cancelled or overtaken can never deliver its move.
+    def __init__(self, ai, on_result=None):
+        self.ai = ai
+        self.on_result = on_result
+        self.jobs = queue.Queue()
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.stop_event = threading.Event()
+        self.timer = None
+        self.result = None
+        self.thread = threading.Thread(target=self.run, name="ai-worker", daemon=True)
+        self.thread.start()
+    def submit(self, kind, board):
+        # kind is "move" (AI.choose_move) or "ponder" (AI.ponder); returns the job's generation.
+        with self.lock:
+            self._cancel()
+            generation = self.generation
+            self.stop_event = threading.Event()
+            self.jobs.put((generation, kind, board.copy(), self.stop_event))
+        return generation
+    def cancel(self):
+        with self.lock:
+            self._cancel()
+    def _cancel(self):
+        self.generation += 1
+        self.result = None
+        self.stop_event.set()
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+    def finish_in(self, seconds, generation):
+        # Give the job a deadline, e.g. a ponder search whose move was played.
+        with self.lock:
+            if generation != self.generation:
+                return
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(max(0.0, seconds), self.stop_event.set)
+            self.timer.daemon = True
+            self.timer.start()
+    def take(self, generation):
+        # (kind, move) once the job has finished, otherwise None.
+        with self.lock:
+            if self.result is None or self.result[0] != generation:
+                return None
+            _, kind, move = self.result
+            self.result = None
+            return kind, move
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            generation, kind, board, stop_event = job
+            if stop_event.is_set():
+                continue
+            if kind == "ponder":
+                move = self.ai.ponder(board, stop_event)
+            else:
+                move = self.ai.choose_move(board, stop_event)
+            with self.lock:
+                if generation != self.generation:
+                    continue
+                self.result = (generation, kind, move)
+            if self.on_result is not None:
+                self.on_result(generation, kind, move)
+    def shutdown(self):
+        self.cancel()
+        self.jobs.put(None)
+        self.thread.join()
@@ -0,0 +1,22 @@
+import random
+import chess
+import pytest
+
+# Seeded random games shared by the parity tests: move stacks from the start position.
+GAMES = 40
+MAX_PLIES = 160
+
+def random_game(seed):
+    # Captures and promotions are preferred now and then, so the corpus reaches
+    # endgames, en passant and underpromotion rather than only shuffling pieces.
+    rng = random.Random(seed)
+    board = chess.Board()
+    while not board.is_game_over() and board.ply() < MAX_PLIES:
+        moves = list(board.legal_moves)
+        tactical = [move for move in moves if move.promotion or board.is_capture(move)]
+        board.push(rng.choice(tactical if tactical and rng.random() < 0.3 else moves))
+    return board.move_stack
+
+@pytest.fixture(scope="session")
+def corpus():
+    return [random_game(seed) for seed in range(GAMES)]
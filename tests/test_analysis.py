@@ -0,0 +1,47 @@
+import json
+import pytest
+from chess_game_modules.analysis import main
+
+GOOD = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+# The side not to move is in check.
+ILLEGAL = "6k1/5ppp/8/8/8/8/5PPP/r5K1 b - - 0 1"
+
+PGN = f"""[Event "first"]
+
+1. e4 e5 *
+
+[Event "bad"]
+[FEN "{ILLEGAL}"]
+[SetUp "1"]
+
+1... Ra2 *
+
+[Event "last"]
+
+1. d4 *
+"""
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_bad_records_are_reported_and_skipped(tmp_path, workers):
+    positions = tmp_path / "positions.epd"
+    positions.write_text(f"{GOOD}\nnot a fen at all\n{ILLEGAL}\n{GOOD}\n")
+    games = tmp_path / "games.pgn"
+    games.write_text(PGN)
+    output = tmp_path / "out.jsonl"
+    assert main([str(positions), str(games), "-o", str(output), "--depth", "1", "-j", workers]) == 0
+    lines = [json.loads(line) for line in output.read_text().splitlines()]
+    errors = [line["record"] for line in lines if "error" in line]
+    assert errors == [1, 2, 5]
+    # Every good record is still analysed, in input order: 1 + 1 positions, then 3 + 2 from the games.
+    analysed = [line["record"] for line in lines if "error" not in line]
+    assert analysed == [0, 3, 4, 4, 4, 6, 6]
+    assert all(line["best"] for line in lines if "error" not in line and line["record"] < 4)
+
+def test_bad_game_keeps_its_place_in_pgn_output(tmp_path):
+    games = tmp_path / "games.pgn"
+    games.write_text(PGN)
+    output = tmp_path / "out.pgn"
+    assert main([str(games), "-o", str(output), "--depth", "1"]) == 0
+    text = output.read_text()
+    assert text.index('"first"') < text.index('"bad"') < text.index('"last"')
+    assert "{ not analysed: illegal position" in text
@@ -0,0 +1,28 @@
+import chess
+import pytest
+from chess_game_modules.ai import center_control, material_score
+from chess_game_modules.pawns import pawn_structure
+
+np = pytest.importorskip("numpy")
+from chess_game_modules.batch import evaluate_batch, evaluate_terms
+
+@pytest.fixture(scope="module")
+def boards(corpus):
+    boards = []
+    for moves in corpus:
+        board = chess.Board()
+        for move in moves:
+            board.push(move)
+            boards.append(board.copy(stack=False))
+    return boards
+
+def test_terms_match_scalar_evaluation(boards):
+    terms = evaluate_terms(boards)
+    assert terms["material"].tolist() == [material_score(board) for board in boards]
+    assert terms["pawns"].tolist() == [pawn_structure(board) for board in boards]
+    assert terms["center"].tolist() == [center_control(board) for board in boards]
+
+def test_batch_is_the_sum_of_the_terms(boards):
+    expected = [material_score(board) + pawn_structure(board) + center_control(board) for board in boards]
+    # A chunk size that doesn't divide the corpus, so the last partial chunk is covered too.
+    assert evaluate_batch(boards, chunk_size=1000).tolist() == expected
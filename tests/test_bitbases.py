@@ -0,0 +1,49 @@
+import os
+import chess
+import pytest
+from chess_game_modules.ai import AI
+from chess_game_modules.bitbases import Bitbases
+
+BITBASE_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "bitbases")
+
+WON_PIECE_ENDINGS = ["8/8/8/4k3/8/8/8/R3K3 w - - 0 1", "8/8/8/4k3/8/8/8/3QK3 w - - 0 1", "r3k3/8/8/8/4K3/8/8/8 b - - 0 1"]
+WON_KPK = ["8/1P6/1K6/8/8/8/5k2/8 w - - 0 1", "8/8/8/4k3/8/8/1P6/1K6 w - - 0 1"]
+
+@pytest.fixture(scope="module")
+def bitbases():
+    bitbases = Bitbases.open(BITBASE_DIR)
+    if bitbases is None:
+        pytest.skip("bitbases not generated")
+    yield bitbases
+    bitbases.close()
+
+def test_promotion_scores_above_pawn(bitbases):
+    board = chess.Board(WON_KPK[0])
+    pawn = bitbases.evaluate(board)
+    for promotion in (chess.QUEEN, chess.ROOK):
+        board.push(chess.Move(chess.B7, chess.B8, promotion))
+        assert bitbases.evaluate(board) > pawn > 0
+        board.pop()
+
+def play_out(fen, native, depth, max_plies):
+    board = chess.Board(fen)
+    ai = AI("Hard", book_path=None, bitbase_dir=BITBASE_DIR, seed=0, native=native)
+    while not board.is_game_over(claim_draw=True) and board.ply() < max_plies:
+        _, move = ai.search(board, max_depth=depth)
+        board.push(move)
+    ai.close()
+    return board
+
+@pytest.mark.parametrize("native", [True, False])
+@pytest.mark.parametrize("fen", WON_KPK)
+def test_won_kpk_promotes(bitbases, fen, native):
+    board = play_out(fen, native, 5, 60)
+    assert any(move.promotion for move in board.move_stack)
+    assert board.result(claim_draw=True) == "1-0"
+
+@pytest.mark.parametrize("native", [True, False])
+@pytest.mark.parametrize("fen", WON_PIECE_ENDINGS)
+def test_won_piece_endings_are_mated(bitbases, fen, native):
+    # Against a centralised defender, without repeating into a draw.
+    board = play_out(fen, native, 4, 100)
+    assert board.is_checkmate()
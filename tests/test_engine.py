@@ -0,0 +1,50 @@
+import io
+import time
+from chess_game_modules.engine import UCIEngine
+
+def run(commands):
+    output = io.StringIO()
+    engine = UCIEngine(output)
+    for command in commands:
+        engine.handle(command)
+        if engine.search_thread is not None:
+            engine.search_thread.join()
+    return output.getvalue().splitlines()
+
+def test_mate_is_reported_in_moves():
+    lines = run(["position fen k7/8/2K5/8/8/8/8/3R4 w - - 0 1", "go depth 4"])
+    assert lines[-2].split()[3:6] == ["score", "mate", "2"]
+    lines = run(["position fen 7k/8/8/8/8/1r6/r7/7K w - - 0 1", "go depth 4"])
+    assert lines[-2].split()[3:6] == ["score", "mate", "-1"]
+
+def test_infinite_waits_for_stop_after_mate():
+    output = io.StringIO()
+    engine = UCIEngine(output)
+    engine.handle("position fen 6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1")
+    engine.handle("go infinite")
+    time.sleep(0.5)
+    assert "score mate 1" in output.getvalue()
+    assert "bestmove" not in output.getvalue()
+    engine.handle("stop")
+    assert output.getvalue().splitlines()[-1] == "bestmove a1a8"
+
+def test_bad_position_is_reported_not_fatal():
+    lines = run([
+        "position startpos moves e2e4",
+        "position startpos moves e2e5",
+        "position fen 6k1/5ppp/8/8/8/8/5PPP/r5K1 b - - 0 1",
+        "position fen not a fen",
+        "go depth 1",
+    ])
+    assert [line.split()[:2] for line in lines[:3]] == [["info", "string"]] * 3
+    assert "e2e5" in lines[0]
+    # The last good position (after 1. e4) is still the one searched.
+    assert lines[-1].split()[1][1] in "78"
+
+def test_bare_go_ends_when_input_closes():
+    output = io.StringIO()
+    engine = UCIEngine(output)
+    start = time.time()
+    engine.loop(["position startpos moves e2e4", "go"])
+    assert time.time() - start < 5
+    assert output.getvalue().splitlines()[-1].startswith("bestmove ")
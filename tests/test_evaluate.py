@@ -0,0 +1,171 @@
+import chess
+import chess.polyglot
+from chess_game_modules.ai import PST_SCORES, IncrementalEvaluator, evaluate, material_score, native_evaluate
+from chess_game_modules.pawns import pawn_key, pawn_structure
+from chess_game_modules.position import Position, encode_move
+
+def old_evaluate(board):
+    # evaluate() as it was before the incremental score and the pawn hash, kept
+    # frozen so refactors of the fast path can be checked against it.
+    if board.is_checkmate():
+        return -999999 if board.turn else 999999
+    if board.is_stalemate() or board.is_insufficient_material():
+        return 0
+    tables = {
+        chess.PAWN: [
+            0, 0, 0, 0, 0, 0, 0, 0,
+            50, 50, 50, 50, 50, 50, 50, 50,
+            10, 10, 20, 30, 30, 20, 10, 10,
+            5, 5, 10, 25, 25, 10, 5, 5,
+            0, 0, 0, 20, 20, 0, 0, 0,
+            5, -5, -10, 0, 0, -10, -5, 5,
+            5, 10, 10, -20, -20, 10, 10, 5,
+            0, 0, 0, 0, 0, 0, 0, 0,
+        ],
+        chess.KNIGHT: [
+            -50, -40, -30, -30, -30, -30, -40, -50,
+            -40, -20, 0, 0, 0, 0, -20, -40,
+            -30, 0, 10, 15, 15, 10, 0, -30,
+            -30, 5, 15, 20, 20, 15, 5, -30,
+            -30, 0, 15, 20, 20, 15, 0, -30,
+            -30, 5, 10, 15, 15, 10, 5, -30,
+            -40, -20, 0, 5, 5, 0, -20, -40,
+            -50, -40, -30, -30, -30, -30, -40, -50,
+        ],
+        chess.BISHOP: [
+            -20, -10, -10, -10, -10, -10, -10, -20,
+            -10, 0, 0, 0, 0, 0, 0, -10,
+            -10, 0, 5, 10, 10, 5, 0, -10,
+            -10, 5, 5, 10, 10, 5, 5, -10,
+            -10, 0, 10, 10, 10, 10, 0, -10,
+            -10, 10, 10, 10, 10, 10, 10, -10,
+            -10, 5, 0, 0, 0, 0, 5, -10,
+            -20, -10, -10, -10, -10, -10, -10, -20,
+        ],
+        chess.ROOK: [
+            0, 0, 0, 0, 0, 0, 0, 0,
+            5, 10, 10, 10, 10, 10, 10, 5,
+            -5, 0, 0, 0, 0, 0, 0, -5,
+            -5, 0, 0, 0, 0, 0, 0, -5,
+            -5, 0, 0, 0, 0, 0, 0, -5,
+            -5, 0, 0, 0, 0, 0, 0, -5,
+            -5, 0, 0, 0, 0, 0, 0, -5,
+            0, 0, 0, 5, 5, 0, 0, 0,
+        ],
+        chess.QUEEN: [
+            -20, -10, -10, -5, -5, -10, -10, -20,
+            -10, 0, 0, 0, 0, 0, 0, -10,
+            -10, 0, 5, 5, 5, 5, 0, -10,
+            -5, 0, 5, 5, 5, 5, 0, -5,
+            0, 0, 5, 5, 5, 5, 0, -5,
+            -10, 5, 5, 5, 5, 5, 0, -10,
+            -10, 0, 5, 0, 0, 0, 0, -10,
+            -20, -10, -10, -5, -5, -10, -10, -20,
+        ],
+        chess.KING: [
+            -30, -40, -40, -50, -50, -40, -40, -30,
+            -30, -40, -40, -50, -50, -40, -40, -30,
+            -30, -40, -40, -50, -50, -40, -40, -30,
+            -30, -40, -40, -50, -50, -40, -40, -30,
+            -20, -30, -30, -40, -40, -30, -30, -20,
+            -10, -20, -20, -20, -20, -20, -20, -10,
+            20, 20, 0, 0, 0, 0, 20, 20,
+            20, 30, 10, 0, 0, 10, 30, 20,
+        ],
+    }
+    values = {chess.PAWN: 100, chess.KNIGHT: 320, chess.BISHOP: 330, chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 20000}
+    score = 0
+    for sq in chess.SQUARES:
+        piece = board.piece_at(sq)
+        if piece:
+            index = sq if piece.color == chess.WHITE else 63 - sq
+            total_value = values[piece.piece_type] + tables[piece.piece_type][index]
+            score += total_value if piece.color == chess.WHITE else -total_value
+    white_king_square = board.king(chess.WHITE)
+    black_king_square = board.king(chess.BLACK)
+    if white_king_square:
+        score -= len(board.attackers(chess.BLACK, white_king_square)) * 20
+    if black_king_square:
+        score += len(board.attackers(chess.WHITE, black_king_square)) * 20
+    for sq in [chess.D4, chess.D5, chess.E4, chess.E5]:
+        score += (len(board.attackers(chess.WHITE, sq)) - len(board.attackers(chess.BLACK, sq))) * 10
+    mobility_bonus = len(list(board.legal_moves)) * 2
+    score += mobility_bonus if board.turn == chess.WHITE else -mobility_bonus
+    white_pawns = board.pieces(chess.PAWN, chess.WHITE)
+    black_pawns = board.pieces(chess.PAWN, chess.BLACK)
+    for file in range(8):
+        white_file_pawns = sum(1 for sq in white_pawns if chess.square_file(sq) == file)
+        black_file_pawns = sum(1 for sq in black_pawns if chess.square_file(sq) == file)
+        if white_file_pawns > 1:
+            score -= (white_file_pawns - 1) * 15
+        if black_file_pawns > 1:
+            score += (black_file_pawns - 1) * 15
+    for file in range(8):
+        adjacent_files = [f for f in [file - 1, file + 1] if 0 <= f <= 7]
+        if any(chess.square_file(sq) == file for sq in white_pawns):
+            if not any(chess.square_file(sq) in adjacent_files for sq in white_pawns):
+                score -= 20
+        if any(chess.square_file(sq) == file for sq in black_pawns):
+            if not any(chess.square_file(sq) in adjacent_files for sq in black_pawns):
+                score += 20
+    return score
+
+def assert_incremental(board, evaluator):
+    assert evaluator.score == material_score(board)
+    assert evaluator.pawn_key == pawn_key(board)
+    assert evaluator.key(board) == chess.polyglot.zobrist_hash(board)
+
+def assert_native(board, position):
+    assert position.key == chess.polyglot.zobrist_hash(board)
+    assert position.score == material_score(board)
+    assert position.pawn_key == pawn_key(board)
+    assert list(position.legal_moves()) == [encode_move(move) for move in board.legal_moves]
+
+def test_corpus_covers_special_moves(corpus):
+    board = chess.Board()
+    seen = set()
+    for moves in corpus:
+        board.reset()
+        for move in moves:
+            if board.is_castling(move):
+                seen.add("castling")
+            elif board.is_en_passant(move):
+                seen.add("en passant")
+            elif move.promotion:
+                seen.add("promotion")
+            board.push(move)
+    assert seen == {"castling", "en passant", "promotion"}
+
+def test_incremental_score_after_push_and_pop(corpus):
+    for moves in corpus:
+        board = chess.Board()
+        evaluator = IncrementalEvaluator(board)
+        for move in moves:
+            evaluator.push(board, move)
+            assert_incremental(board, evaluator)
+        while board.move_stack:
+            evaluator.pop(board)
+            assert_incremental(board, evaluator)
+
+def test_position_after_push_and_pop(corpus):
+    for moves in corpus:
+        board = chess.Board()
+        position = Position(board, PST_SCORES)
+        for move in moves:
+            board.push(move)
+            position.push(encode_move(move))
+            assert_native(board, position)
+        while board.move_stack:
+            board.pop()
+            position.pop()
+            assert_native(board, position)
+
+def test_evaluate_matches_old_implementation(corpus):
+    for moves in corpus:
+        board = chess.Board()
+        for move in moves:
+            board.push(move)
+            expected = old_evaluate(board)
+            assert evaluate(board) == expected
+            assert evaluate(board, material_score(board), pawn_structure(board)) == expected
+            assert native_evaluate(Position(board, PST_SCORES), pawn_structure(board)) == expected
@@ -0,0 +1,33 @@
+import chess
+import pytest
+from chess_game_modules.ai import AI, PST_SCORES, IncrementalEvaluator, SearchContext, native_quiescence, quiescence
+from chess_game_modules.position import Position
+
+# White to move can take a loose queen.
+HANGING_QUEEN = "4k3/8/8/3q4/8/8/3R4/4K3 w - - 0 1"
+
+def run_quiescence(board, native, ctx):
+    if native:
+        return native_quiescence(Position(board, PST_SCORES), -100_000, 100_000, ctx)
+    ctx.evaluator = IncrementalEvaluator(board)
+    return quiescence(board, -100_000, 100_000, ctx)
+
+@pytest.mark.parametrize("native", [True, False])
+def test_qnode_budget_is_per_horizon_node(native):
+    board = chess.Board(HANGING_QUEEN)
+    fresh = SearchContext()
+    expected = run_quiescence(board, native, fresh)
+    assert expected > fresh.native_evaluate_relative(Position(board, PST_SCORES)) + 500
+    # Deep into a long search: earlier horizon nodes must not use up this one's budget.
+    ctx = SearchContext()
+    ctx.stats.qnodes = 10 * ctx.qnode_limit
+    assert run_quiescence(board, native, ctx) == expected
+    assert ctx.stats.qnode_limit_hits == fresh.stats.qnode_limit_hits
+
+@pytest.mark.parametrize("native", [True, False])
+def test_search_rejects_invalid_position(native):
+    # The side not to move is in check.
+    ai = AI(book_path=None, native=native)
+    with pytest.raises(ValueError, match="illegal position"):
+        ai.search(chess.Board("6k1/5ppp/8/8/8/8/5PPP/r5K1 b - - 0 1"), max_depth=2)
+    ai.close()
@@ -0,0 +1,13 @@
+import pytest
+from chess_game_modules.selfplay import main, parse_config
+
+def test_time_zero_needs_depth():
+    assert parse_config("Hard,time=0,depth=2") == {"difficulty": "Hard", "think_time": 0.0, "max_depth": 2}
+    with pytest.raises(ValueError, match="depth"):
+        parse_config("Hard,time=0")
+
+@pytest.mark.parametrize("argv", [["Hard,time=0", "Easy"], ["Hard", "Easy", "--games", "0"]])
+def test_main_rejects_bad_arguments(argv):
+    with pytest.raises(SystemExit) as error:
+        main(argv)
+    assert error.value.code == 2